@@ -13,7 +13,6 @@ from .sync_engine import SyncEngine
 from .metadata_handler import MetadataCloner
 from .drive_sync_manager import DriveSyncManager
 from .discogs_manager import DiscogsManager
-from .discogs_manager import DiscogsManager
 
 def extract_track_metadata(file_path: Path) -> dict:
     """Extract metadata from an audio file.
@@ -126,6 +126,11 @@ class CrateHandler:
     def add_track_to_crate(self, new_path: str) -> bool:
         """Appends a new track to the end of the crate file.
         Returns True if the track was added, False if it already existed or an error occurred."""
+        return self.add_tracks_to_crate([new_path]) == 1
+
+    def add_tracks_to_crate(self, new_paths: List[str]) -> int:
+        """Appends every track not already in the crate with a single write.
+        Returns the number of tracks added (0 if none were new or an error occurred)."""
         if not self.crate_path.exists():
             # Create a basic Serato crate with version block
             try:
@@ -137,32 +142,38 @@ class CrateHandler:
                     f.write(vrsn_block)
             except Exception as e:
                 print(f"Error creating new crate {self.crate_path.name}: {e}")
-                return False
+                return 0
 
         try:
-            # Check if track already exists to ensure idempotency
-            existing_tracks = self.get_tracks()
-            norm_new_path = new_path.lstrip('/')
-            if any(t['local_path'].lstrip('/') == norm_new_path for t in existing_tracks):
-                return False
-
-            # Prepare new otrk block
-            # Format: 'otrk' + length + 'ptrk' + length + value
-            ptrk_val = norm_new_path.encode('utf-16-be')
-            ptrk_len = len(ptrk_val)
-            
-            ptrk_block = b'ptrk' + struct.pack('>I', ptrk_len) + ptrk_val
-            
-            otrk_len = len(ptrk_block)
-            otrk_block = b'otrk' + struct.pack('>I', otrk_len) + ptrk_block
-            
-            with open(self.crate_path, 'ab') as f:
-                f.write(otrk_block)
-                
-            return True
+            # Skip tracks already in the crate (or repeated in new_paths) to ensure idempotency
+            known_paths = {t['local_path'].lstrip('/') for t in self.get_tracks()}
+            new_blocks = bytearray()
+            added = 0
+            for new_path in new_paths:
+                norm_new_path = new_path.lstrip('/')
+                if norm_new_path in known_paths:
+                    continue
+                known_paths.add(norm_new_path)
+
+                # Prepare new otrk block
+                # Format: 'otrk' + length + 'ptrk' + length + value
+                ptrk_val = norm_new_path.encode('utf-16-be')
+                ptrk_len = len(ptrk_val)
+
+                ptrk_block = b'ptrk' + struct.pack('>I', ptrk_len) + ptrk_val
+
+                otrk_len = len(ptrk_block)
+                new_blocks += b'otrk' + struct.pack('>I', otrk_len) + ptrk_block
+                added += 1
+
+            if added:
+                with open(self.crate_path, 'ab') as f:
+                    f.write(new_blocks)
+
+            return added
         except Exception as e:
-            print(f"Error adding track to crate {self.crate_path.name}: {e}")
-            return False
+            print(f"Error adding tracks to crate {self.crate_path.name}: {e}")
+            return 0
 
     @staticmethod
     def list_all_crates(serato_dir: str) -> List[Path]:
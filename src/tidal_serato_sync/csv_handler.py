@@ -18,7 +18,8 @@ class CSVHandler:
         """
         Parses the tracks from the CSV file.
 
-        :return: A list of dictionaries, each containing 'track_name' and 'artist_name'.
+        :return: A list of dictionaries, each containing 'track_name', 'artist_name' and 'isrc'
+                 (None when the CSV has no ISRC column or the cell is empty).
         :raises FileNotFoundError: If the CSV file does not exist.
         :raises ValueError: If the CSV file is empty or missing required columns.
         """
@@ -35,7 +36,8 @@ class CSVHandler:
             # Map possible header names
             field_map = {
                 'track': next((f for f in reader.fieldnames if f.lower() in ['title', 'track_name', 'track']), None),
-                'artist': next((f for f in reader.fieldnames if f.lower() in ['artist', 'artist_name']), None)
+                'artist': next((f for f in reader.fieldnames if f.lower() in ['artist', 'artist_name']), None),
+                'isrc': next((f for f in reader.fieldnames if f.lower() == 'isrc'), None)
             }
 
             if not field_map['track'] or not field_map['artist']:
@@ -47,11 +49,13 @@ class CSVHandler:
             for row in reader:
                 track_name = row.get(field_map['track'], '').strip()
                 artist_name = row.get(field_map['artist'], '').strip()
+                isrc = (row.get(field_map['isrc']) or '').strip() if field_map['isrc'] else ''
                 
                 if track_name and artist_name:
                     tracks.append({
                         'track_name': track_name,
-                        'artist_name': artist_name
+                        'artist_name': artist_name,
+                        'isrc': isrc or None
                     })
 
         if not tracks:
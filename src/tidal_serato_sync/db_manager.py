@@ -1,6 +1,12 @@
+import json
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
+
+# Max bound parameters per "IN (...)" query; older SQLite builds cap a statement at 999
+SQL_IN_CHUNK_SIZE = 500
 
 
 class DatabaseManager:
@@ -8,11 +14,64 @@ class DatabaseManager:
 
     def __init__(self, db_path: str = "sync_map.db"):
         self.db_path = Path(db_path)
+        # Per-thread long-lived connection, and whether batch_writes() is holding its commit
+        self._local = threading.local()
         self._init_db()
 
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        # WAL keeps readers unblocked while a batch is open; NORMAL only fsyncs at checkpoints
+        conn.execute("PRAGMA synchronous = NORMAL")
+        # Read pages straight from the OS page cache instead of copying them into SQLite's own
+        conn.execute("PRAGMA mmap_size = 268435456")
+        return conn
+
+    def _thread_conn(self) -> sqlite3.Connection:
+        """This thread's connection, opened (and configured) once instead of per call."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        return conn
+
+    @contextmanager
+    def _connect(self):
+        """Yields this thread's connection; commits on exit unless a batch_writes() block is open."""
+        conn = self._thread_conn()
+        if getattr(self._local, 'batch', False):
+            yield conn
+            return
+        with conn:
+            yield conn
+
+    @contextmanager
+    def batch_writes(self):
+        """
+        Groups every write made by this thread inside the block into a single commit,
+        instead of one commit (and fsync) per call. Nested blocks join the outer one.
+        Work done before an exception is still committed, as it would be without batching.
+        """
+        if getattr(self._local, 'batch', False):
+            yield
+            return
+        conn = self._thread_conn()
+        self._local.batch = True
+        try:
+            yield
+        finally:
+            self._local.batch = False
+            conn.commit()
+
+    def close(self):
+        """Closes this thread's connection; the next call opens a new one."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
     def _init_db(self):
         """Initializes the database schema."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
             cursor = conn.cursor()
             # Table for track mapping
             cursor.execute("""
@@ -49,6 +108,25 @@ class DatabaseManager:
                 )
             """)
             
+            # Last fetched track list of each Tidal playlist, reused while the playlist is unchanged
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS playlist_snapshot (
+                    playlist_id TEXT PRIMARY KEY,
+                    version TEXT,
+                    tracks TEXT
+                )
+            """)
+            
+            # Tidal search results for (title, artist) queries, so repeated imports skip the search
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    query_key TEXT PRIMARY KEY,
+                    tidal_id TEXT,
+                    name TEXT,
+                    artist TEXT
+                )
+            """)
+            
             # Migration check: ensure crate_path exists in mirror_config
             cursor.execute("PRAGMA table_info(mirror_config)")
             columns = [info[1] for info in cursor.fetchall()]
@@ -78,52 +156,102 @@ class DatabaseManager:
             # Migration check: ensure display_name column exists
             if 'display_name' not in cols:
                 cursor.execute("ALTER TABLE track_mapping ADD COLUMN display_name TEXT")
+
+            # Migration check: ensure file stat columns exist (unchanged-file fast path in sync)
+            if 'mtime_ns' not in cols:
+                cursor.execute("ALTER TABLE track_mapping ADD COLUMN mtime_ns INTEGER")
+            if 'size' not in cols:
+                cursor.execute("ALTER TABLE track_mapping ADD COLUMN size INTEGER")
             
+            # Recovery and cleanup select the few pending rows by status; avoid scanning the whole library.
+            # Covering get_pending_downloads' columns so it is answered from the index alone.
+            cursor.execute("DROP INDEX IF EXISTS idx_track_mapping_status")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_track_mapping_status_cover "
+                "ON track_mapping(status, local_path, tidal_track_id)"
+            )
+
             # Clean up existing crate_name extensions if any
             cursor.execute("UPDATE mirror_config SET crate_name = REPLACE(crate_name, '.crate', '') WHERE crate_name LIKE '%.crate'")
-            conn.commit()
 
-    def upsert_track(self, local_path: str, tidal_id: str, isrc: Optional[str] = None, bitrate: Optional[int] = None, display_name: Optional[str] = None):
-        """Adds or updates a track mapping."""
-        with sqlite3.connect(self.db_path) as conn:
+    def upsert_track(self, local_path: str, tidal_id: str, isrc: Optional[str] = None, bitrate: Optional[int] = None, display_name: Optional[str] = None,
+                     mtime_ns: Optional[int] = None, size: Optional[int] = None):
+        """Adds or updates a track mapping. mtime_ns/size are the stat of the file the bitrate was read from."""
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                INSERT INTO track_mapping (local_path, tidal_track_id, isrc, bitrate, last_sync, display_name)
-                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+                INSERT INTO track_mapping (local_path, tidal_track_id, isrc, bitrate, last_sync, display_name, mtime_ns, size)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, ?, ?, ?)
                 ON CONFLICT(local_path) DO UPDATE SET
                     tidal_track_id = excluded.tidal_track_id,
                     isrc = excluded.isrc,
                     bitrate = COALESCE(excluded.bitrate, track_mapping.bitrate),
                     display_name = COALESCE(excluded.display_name, track_mapping.display_name),
+                    mtime_ns = COALESCE(excluded.mtime_ns, track_mapping.mtime_ns),
+                    size = COALESCE(excluded.size, track_mapping.size),
                     last_sync = CURRENT_TIMESTAMP
-            """, (local_path, tidal_id, isrc, bitrate, display_name))
-            conn.commit()
+            """, (local_path, tidal_id, isrc, bitrate, display_name, mtime_ns, size))
 
     def update_track_status(self, local_path: str, status: str, downloaded_path: Optional[str] = None):
         """Updates the status and optional downloaded path of a track."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             if downloaded_path:
                 cursor.execute("UPDATE track_mapping SET status = ?, downloaded_path = ? WHERE local_path = ?", (status, downloaded_path, local_path))
             else:
                 cursor.execute("UPDATE track_mapping SET status = ? WHERE local_path = ?", (status, local_path))
-            conn.commit()
+
+    def mark_synced(self, local_path: str, mtime_ns: int, size: int):
+        """Marks a track as synced and records the stat of the local file it was synced from."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE track_mapping SET status = 'synced', mtime_ns = ?, size = ? WHERE local_path = ?",
+                (mtime_ns, size, local_path)
+            )
 
     def get_track_info(self, local_path: str) -> Optional[Dict]:
-        """Gets the Tidal ID, bitrate, display name and status for a given local path."""
-        with sqlite3.connect(self.db_path) as conn:
+        """Gets the Tidal ID, bitrate, display name, status and last synced file stat for a given local path."""
+        with self._connect() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT tidal_track_id, bitrate, display_name, status FROM track_mapping WHERE local_path = ?", (local_path,))
+            cursor.execute("SELECT tidal_track_id, bitrate, display_name, status, mtime_ns, size FROM track_mapping WHERE local_path = ?", (local_path,))
             result = cursor.fetchone()
             if result:
                 return {
                     'tidal_id': result[0], 
                     'bitrate': result[1], 
                     'display_name': result[2],
-                    'status': result[3]
+                    'status': result[3],
+                    'mtime_ns': result[4],
+                    'size': result[5]
                 }
             return None
 
+    def get_tracks_info(self, local_paths: List[str]) -> Dict[str, Dict]:
+        """
+        Bulk version of get_track_info: returns {local_path: info} for the paths that are mapped.
+        Queries in chunks to stay under SQLite's host parameter limit.
+        """
+        tracks_info = {}
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(local_paths), SQL_IN_CHUNK_SIZE):
+                chunk = local_paths[start:start + SQL_IN_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT local_path, tidal_track_id, bitrate, display_name, status, mtime_ns, size FROM track_mapping WHERE local_path IN ({placeholders})",
+                    chunk
+                )
+                for local_path, tidal_id, bitrate, display_name, status, mtime_ns, size in cursor.fetchall():
+                    tracks_info[local_path] = {
+                        'tidal_id': tidal_id,
+                        'bitrate': bitrate,
+                        'display_name': display_name,
+                        'status': status,
+                        'mtime_ns': mtime_ns,
+                        'size': size
+                    }
+        return tracks_info
+
     def get_tidal_id(self, local_path: str) -> Optional[str]:
         """Gets the Tidal ID for a given local path."""
         info = self.get_track_info(local_path)
@@ -134,7 +262,7 @@ class DatabaseManager:
         Finds a track mapping by its Tidal ID.
         Prioritizes existing files (status='synced').
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             # We prefer synced tracks that actually have a local path that exists (or just any synced one)
             cursor.execute("""
@@ -152,28 +280,34 @@ class DatabaseManager:
                 }
             return None
 
+    def get_pending_downloads(self) -> List[tuple]:
+        """Returns (local_path, tidal_track_id) for every track marked as pending_download."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT local_path, tidal_track_id FROM track_mapping WHERE status = 'pending_download'"
+            ).fetchall()
+
     def get_synced_tracks_info(self) -> list:
         """Returns local_path, display_name, tidal_track_id for all synced tracks."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT local_path, display_name, tidal_track_id FROM track_mapping WHERE status = 'synced'")
             return cursor.fetchall()
 
     def bulk_add_discovered_crates(self, crates):
         """Adds multiple crates as discovered/inactive."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             for crate_path in crates:
                 cursor.execute("""
                     INSERT OR IGNORE INTO mirror_config (crate_path, crate_name, is_active)
                     VALUES (?, ?, 0)
                 """, (str(crate_path), crate_path.stem))
-            conn.commit()
 
     def add_mirror(self, crate_path: str, playlist_id: Optional[str], direction: str = "bidirectional", is_active: int = 1):
         """Configures a mirror between a crate and a playlist."""
         crate_name = Path(crate_path).stem
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO mirror_config (crate_path, crate_name, tidal_playlist_id, sync_direction, is_active)
@@ -183,14 +317,12 @@ class DatabaseManager:
                     sync_direction = excluded.sync_direction,
                     is_active = excluded.is_active
             """, (crate_path, crate_name, playlist_id, direction, is_active))
-            conn.commit()
 
     def remove_mirror(self, crate_path: str):
         """Removes a mirror from the database when the crate no longer exists."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM mirror_config WHERE crate_path = ?", (str(crate_path),))
-            conn.commit()
 
     def get_mirrors(self, only_active: bool = False):
         """Returns all configured mirrors."""
@@ -198,39 +330,77 @@ class DatabaseManager:
         if only_active:
             query += " WHERE is_active = 1"
             
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute(query)
             return cursor.fetchall()
             
     def add_pending_crate_addition(self, tidal_id: str, crate_path: str):
         """Records a new Tidal track that needs to be added to a Crate once downloaded."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT OR IGNORE INTO pending_crate_additions (tidal_id, crate_path)
                 VALUES (?, ?)
             """, (tidal_id, str(crate_path)))
-            conn.commit()
             
     def get_pending_crate_additions(self, tidal_id: str) -> list[str]:
         """Returns the list of crate paths that are waiting for this Tidal track."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT crate_path FROM pending_crate_additions WHERE tidal_id = ?", (tidal_id,))
             return [row[0] for row in cursor.fetchall()]
             
     def remove_pending_crate_additions(self, tidal_id: str):
         """Clears all pending crate additions for a specific Tidal track once applied."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM pending_crate_additions WHERE tidal_id = ?", (tidal_id,))
-            conn.commit()
+
+    def get_playlist_snapshot(self, playlist_id: str, version: str) -> Optional[List[Tuple[str, str, Optional[str]]]]:
+        """Returns the cached (tidal_id, name, artist) tracks of a playlist, or None unless stored for this version."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT tracks FROM playlist_snapshot WHERE playlist_id = ? AND version = ?", (playlist_id, version)
+            ).fetchone()
+        return [tuple(t) for t in json.loads(row[0])] if row else None
+
+    def save_playlist_snapshot(self, playlist_id: str, version: str, tracks: List[Tuple[str, str, Optional[str]]]):
+        """Stores a playlist's (tidal_id, name, artist) tracks as of the given version."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO playlist_snapshot (playlist_id, version, tracks) VALUES (?, ?, ?)",
+                (playlist_id, version, json.dumps(tracks))
+            )
+
+    @staticmethod
+    def _search_key(title: str, artist: str) -> str:
+        return f"{title.strip().lower()}|{artist.strip().lower()}"
+
+    def get_cached_search(self, title: str, artist: str) -> Optional[Tuple[str, str, str]]:
+        """Returns the (tidal_id, name, artist) found earlier for this title/artist, if any."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT tidal_id, name, artist FROM search_cache WHERE query_key = ?", (self._search_key(title, artist),)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def cache_search(self, title: str, artist: str, tidal_id: str, name: str, track_artist: str):
+        """Remembers the Tidal track found for a title/artist search."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache (query_key, tidal_id, name, artist) VALUES (?, ?, ?, ?)",
+                (self._search_key(title, artist), str(tidal_id), name, track_artist)
+            )
+
+    def delete_track(self, local_path: str):
+        """Removes the mapping for a local path."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM track_mapping WHERE local_path = ?", (local_path,))
 
     def clear_all_track_mappings(self):
         """Removes all track mappings and pending cleanup records from the database."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM track_mapping")
             cursor.execute("DELETE FROM pending_crate_additions")
-            conn.commit()
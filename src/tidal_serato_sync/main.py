@@ -1,7 +1,10 @@
 import argparse
+import logging
 import sys
 from pathlib import Path
+from types import SimpleNamespace
 from .csv_handler import CSVHandler
+from .db_manager import DatabaseManager
 from .tidal_manager import TidalManager
 
 
@@ -13,6 +16,8 @@ def main():
     parser.add_argument("--description", help="Description for the playlist.", default="Created via Tidal Playlist Creator")
     
     args = parser.parse_args()
+    # TidalManager reports playlist updates through logging; show them like the rest of the output
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
 
     csv_path = Path(args.csv_path)
     if not csv_path.exists():
@@ -39,12 +44,22 @@ def main():
     # 3. Search for tracks on Tidal
     print("\nSearching for tracks on Tidal...")
     found_track_ids = []
-    for track_info in tracks_to_find:
-        track_name = track_info['track_name']
-        artist_name = track_info['artist_name']
-        
+    # Rows found on an earlier run come from the local search cache; only the rest are searched,
+    # concurrently, with results reported in CSV order
+    db = DatabaseManager()
+    queries = [(t['track_name'], t['artist_name'], t.get('isrc')) for t in tracks_to_find]
+    cached = {query: db.get_cached_search(*query[:2]) for query in queries}
+    searched = manager.search_many([query for query in queries if not cached[query]])
+    for query in queries:
+        track_name, artist_name, _ = query
         print(f" Searching: {track_name} by {artist_name}...", end="", flush=True)
-        track = manager.search_track(track_name, artist_name)
+        if cached[query]:
+            tidal_id, name, track_artist = cached[query]
+            track = SimpleNamespace(id=tidal_id, name=name, artist=SimpleNamespace(name=track_artist))
+        else:
+            track = next(searched)
+            if track:
+                db.cache_search(track_name, artist_name, track.id, track.name, track.artist.name)
         
         if track:
             print(f" Found! ({track.name} by {track.artist.name})")
@@ -1,13 +1,116 @@
-import base64
+import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Optional
 import logging
 from mutagen import File
+from mutagen.aiff import AIFF
 from mutagen.flac import FLAC
+from mutagen.id3 import ID3FileType, GEOB, TKEY, TBPM, TCOM, TIT1, COMM, TCON, TPUB, TXXX, POPM
+from mutagen.mp3 import MP3
 from mutagen.mp4 import MP4
+from mutagen.wave import WAVE
+
+try:
+    # SIMD-accelerated drop-in for the stdlib module; Serato Overview/Markers2 blobs are tens of KB
+    import pybase64 as base64
+except ImportError:
+    import base64
 
 logger = logging.getLogger(__name__)
 
+# Only the containers MetadataCloner knows how to read/write, so mutagen.File
+# does not score every format it ships with on each open.
+_SUPPORTED_FORMATS = [MP3, FLAC, MP4, WAVE, AIFF, ID3FileType]
+
+# Every byte outside the standard base64 alphabet (padding included), for bytes.translate
+_B64_ALPHABET = b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+_NON_B64_BYTES = bytes(b for b in range(256) if b not in _B64_ALPHABET)
+
+# Explicit Vorbis Serato keys:
+# 'Serato VidAssoc' -> 'serato_videoassociation', 'Serato Markers2' -> 'serato_markers_v2', etc.
+_FLAC_SERATO_KEYS = {
+    "Serato VidAssoc": "serato_videoassociation",
+    "Serato RelVolAd": "serato_relvol",
+    "Serato Playcount": "serato_playcount",
+    "Serato Autotags": "serato_autotags",
+    "Serato Markers2": "serato_markers_v2",
+    "Serato BeatGrid": "serato_beatgrid",
+    "Serato Overview": "serato_overview",
+    "Serato Analysis": "serato_analysis",
+}
+
+# Padding reserved when a tag write has to rewrite the file anyway, so the
+# next Serato edit (markers, beatgrid, overview) fits in place
+_TAG_WRITE_PADDING = 64 * 1024
+
+# Extensions of the containers inject_serato_markers writes to (MP4 atoms are read-only here)
+_INJECTABLE_SUFFIXES = frozenset({'.flac', '.mp3', '.wav', '.aif', '.aiff'})
+
+# Source tag -> internal tag name, per container, for the plain text DJ tags
+_MP3_TEXT_TAGS = {'TKEY': 'KEY', 'TBPM': 'BPM', 'TCOM': 'COMPOSER', 'TIT1': 'GROUPING', 'TPUB': 'LABEL'}
+_FLAC_TEXT_KEYS = frozenset({'key', 'bpm', 'composer', 'grouping', 'comment', 'genre', 'label', 'publisher', 'rating'})
+_MP4_TEXT_ATOMS = {'\xa9grp': 'GROUPING', '\xa9cmt': 'COMMENT', '\xa9gen': 'GENRE', 'tmpo': 'BPM'}
+_MP4_LABEL_ATOMS = frozenset({'----:com.apple.itunes:publisher', '----:com.apple.itunes:label'})  # matched lowercased
+_MP4_KEY_ATOMS = frozenset({'----:com.apple.iTunes:KEY', '----:com.apple.iTunes:initialkey'})
+
+# MP4 Serato freeform atom name (----:com.serato.dj:<name>) -> GEOB desc used across MP3/FLAC
+_MP4_SERATO_DESCS = {
+    "markers": "Serato Markers_",
+    "markersv2": "Serato Markers2",
+    "beatgrid": "Serato BeatGrid",
+    "autgain": "Serato Autotags",
+    "overview": "Serato Overview",
+    "analysisVersion": "Serato Analysis",
+    "playcount": "SERATO_PLAYCOUNT",
+    "relvol": "SERATO_RELVOL",
+}
+
+# Internal tag name -> ID3 frame builder used when injecting into MP3 files
+_ID3_TEXT_FRAMES = {
+    'KEY': lambda text: TKEY(encoding=3, text=[text]),
+    'BPM': lambda text: TBPM(encoding=3, text=[text]),
+    'COMPOSER': lambda text: TCOM(encoding=3, text=[text]),
+    'GROUPING': lambda text: TIT1(encoding=3, text=[text]),
+    'COMMENT': lambda text: COMM(encoding=3, lang='eng', desc='', text=[text]),
+    'GENRE': lambda text: TCON(encoding=3, text=[text]),
+    'LABEL': lambda text: TPUB(encoding=3, text=[text]),
+    'TPUB': lambda text: TPUB(encoding=3, text=[text]),
+    'SERATO_PLAYCOUNT': lambda text: TXXX(encoding=3, desc='SERATO_PLAYCOUNT', text=[text]),
+    'SERATO_RELVOL': lambda text: TXXX(encoding=3, desc='SERATO_RELVOL', text=[text]),
+}
+
+
+@lru_cache(maxsize=32)
+def _open_cached(path: str, mtime_ns: int, size: int):
+    """Parses an audio file once per (path, mtime, size); a rewrite changes the key."""
+    return File(path, options=_SUPPORTED_FORMATS)
+
+
+def _open_audio(path: str):
+    """Returns the parsed audio file, reusing a previous parse if the file is unchanged."""
+    st = os.stat(path)
+    return _open_cached(path, st.st_mtime_ns, st.st_size)
+
+
+def _tag_padding(info) -> int:
+    """mutagen padding callback: always write in place when the tags fit, pad generously when not."""
+    if info.padding >= 0:
+        return info.padding
+    return max(info.get_default_padding(), _TAG_WRITE_PADDING)
+
+
+def _first_text(frame) -> bytes:
+    """Returns the first text value of an ID3 frame as UTF-8 bytes, without null padding."""
+    return str(frame.text[0]).replace('\x00', '').encode('utf-8')
+
+
+def _decode_loose_b64(val_bytes: bytes) -> bytes:
+    """Decodes the unpadded, newline-wrapped base64 Serato writes into MP4 atoms."""
+    b64_str = val_bytes.translate(None, _NON_B64_BYTES)
+    # Fix invalid base64 lengths (e.g. MTgAC is 5 chars, round down to nearest 4)
+    return base64.b64decode(b64_str[:len(b64_str) - (len(b64_str) % 4)])
+
 class MetadataCloner:
     """Clones Serato-specific metadata and DJ-critical tags between audio files."""
     
@@ -16,42 +119,45 @@ class MetadataCloner:
         """Extracts Serato metadata and standard DJ tags from an audio file."""
         tags_extracted = {}
         try:
-            audio = File(source_path)
+            audio = _open_audio(source_path)
             if audio is None:
                 logger.warning(f"Unsupported audio format for metadata extraction: {source_path}")
                 return tags_extracted
 
             # -- 1. If MP3 (has ID3 tags)
             if hasattr(audio, 'tags') and audio.tags and not isinstance(audio, (FLAC, MP4)):
-                for key, frame in audio.tags.items():
-                    # Serato GEOB
-                    if key.startswith("GEOB") and hasattr(frame, 'desc') and frame.desc.startswith("Serato"):
+                # Pull only the frame types we read, so e.g. APIC cover art is never visited
+                tags = audio.tags
+                for frame in tags.getall('GEOB'):
+                    if frame.desc.startswith("Serato"):
                         clean_desc = frame.desc.replace('\x00', '')
-                        # Serato FLAC strictly requires the GEOB header embedded in the base64 string
-                        wrapper = b'application/octet-stream\x00\x00' + clean_desc.encode('utf-8') + b'\x00'
-                        tags_extracted[clean_desc] = wrapper + frame.data
-                        
-                    # Standard tags
-                    elif key == 'TKEY': tags_extracted['KEY'] = str(frame.text[0]).replace('\x00', '').encode('utf-8')
-                    elif key == 'TBPM': tags_extracted['BPM'] = str(frame.text[0]).replace('\x00', '').encode('utf-8')
-                    elif key == 'TCOM': tags_extracted['COMPOSER'] = str(frame.text[0]).replace('\x00', '').encode('utf-8')
-                    elif key == 'TIT1': tags_extracted['GROUPING'] = str(frame.text[0]).replace('\x00', '').encode('utf-8')
-                    elif key == 'TPUB': tags_extracted['LABEL'] = str(frame.text[0]).replace('\x00', '').encode('utf-8')
-                    elif key.startswith('POPM'):
-                        # mutagen's POPM frame has .rating (0-255) and .email
-                        try:
-                            tags_extracted[f'POPM_{frame.email}'] = str(frame.rating).encode('utf-8')
-                        except Exception:
-                            pass
-                    elif key.startswith('COMM'):
-                        if frame.text:
-                            desc = getattr(frame, 'desc', '')
-                            if 'itun' not in desc.lower():
-                                tags_extracted['COMMENT'] = str(frame.text[0]).replace('\x00', '').encode('utf-8')
-                    elif key.startswith('TXXX:'):
-                        desc = getattr(frame, 'desc', '').upper()
-                        if 'PLAYCOUNT' in desc: tags_extracted['SERATO_PLAYCOUNT'] = str(frame.text[0]).replace('\x00', '').encode('utf-8')
-                        elif 'RELVOL' in desc: tags_extracted['SERATO_RELVOL'] = str(frame.text[0]).replace('\x00', '').encode('utf-8')
+                        # Serato FLAC strictly requires the GEOB header embedded in the base64 string.
+                        # Joined in one allocation so the (possibly large) frame payload is copied once.
+                        tags_extracted[clean_desc] = b''.join(
+                            (b'application/octet-stream\x00\x00', clean_desc.encode('utf-8'), b'\x00', frame.data)
+                        )
+
+                # Standard tags
+                for frame_id, tag_name in _MP3_TEXT_TAGS.items():
+                    frame = tags.get(frame_id)
+                    if frame is not None:
+                        tags_extracted[tag_name] = _first_text(frame)
+
+                for frame in tags.getall('POPM'):
+                    # mutagen's POPM frame has .rating (0-255) and .email
+                    try:
+                        tags_extracted[f'POPM_{frame.email}'] = str(frame.rating).encode('utf-8')
+                    except Exception:
+                        pass
+
+                for frame in tags.getall('COMM'):
+                    if frame.text and 'itun' not in frame.desc.lower():
+                        tags_extracted['COMMENT'] = _first_text(frame)
+
+                for frame in tags.getall('TXXX'):
+                    desc = frame.desc.upper()
+                    if 'PLAYCOUNT' in desc: tags_extracted['SERATO_PLAYCOUNT'] = _first_text(frame)
+                    elif 'RELVOL' in desc: tags_extracted['SERATO_RELVOL'] = _first_text(frame)
 
             # -- 2. If FLAC (has Vorbis comments)
             elif isinstance(audio, FLAC):
@@ -63,7 +169,7 @@ class MetadataCloner:
                                 tags_extracted[key] = base64.b64decode(values[0])
                             except Exception as e:
                                 logger.error(f"Error decoding base64 Serato tag {key} in FLAC: {e}")
-                        elif key_lower in ['key', 'bpm', 'composer', 'grouping', 'comment', 'genre', 'label', 'publisher', 'rating']:
+                        elif key_lower in _FLAC_TEXT_KEYS:
                             # Normalize publisher to label internally
                             tags_extracted['LABEL' if key_lower == 'publisher' else key_lower.upper()] = values[0].encode('utf-8')
 
@@ -71,19 +177,12 @@ class MetadataCloner:
             elif isinstance(audio, MP4):
                 if audio.tags:
                     for key, values in audio.tags.items():
+                        key_lower = key.lower()
                         if key.startswith("----:com.serato.dj:"):
                             # MP4 stores them as e.g. "markers", "markersv2", "beatgrid"
                             # we map them to the standard GEOB desc used across MP3/FLAC
-                            desc = key.split(":")[-1]
-                            if desc == "markers": desc_mapped = "Serato Markers_"
-                            elif desc == "markersv2": desc_mapped = "Serato Markers2"
-                            elif desc == "beatgrid": desc_mapped = "Serato BeatGrid"
-                            elif desc == "autgain": desc_mapped = "Serato Autotags"
-                            elif desc == "overview": desc_mapped = "Serato Overview"
-                            elif desc == "analysisVersion": desc_mapped = "Serato Analysis"
-                            elif desc == "playcount": desc_mapped = "SERATO_PLAYCOUNT"
-                            elif desc == "relvol": desc_mapped = "SERATO_RELVOL"
-                            else: desc_mapped = "Serato " + desc.title()
+                            desc = key.rsplit(":", 1)[-1]
+                            desc_mapped = _MP4_SERATO_DESCS.get(desc) or "Serato " + desc.title()
                             
                             try:
                                 val_bytes = values[0] if isinstance(values[0], bytes) else str(values[0]).encode('ascii')
@@ -93,41 +192,52 @@ class MetadataCloner:
                                     tags_extracted[desc_mapped] = val_bytes
                                 elif desc_mapped == "SERATO_PLAYCOUNT":
                                     # Playcount is usually base64 e.g. 'MTgAC' -> '18'
-                                    import re
-                                    b64_str = re.sub(b'[^A-Za-z0-9+/]', b'', val_bytes)
-                                    # Fix invalid base64 lengths (e.g. MTgAC is 5 chars, round down to nearest 4)
-                                    b64_str = b64_str[:len(b64_str) - (len(b64_str) % 4)]
-                                    raw = base64.b64decode(b64_str)
+                                    raw = _decode_loose_b64(val_bytes)
                                     # Strip null bytes and just keep numeric string
                                     tags_extracted[desc_mapped] = raw.split(b'\x00')[0]
                                 else:
                                     # Standard markers are full Base64 strings including the wrapper
                                     # We decode them to raw binary (with wrapper intact)
-                                    import re
-                                    b64_str = re.sub(b'[^A-Za-z0-9+/]', b'', val_bytes)
-                                    b64_str = b64_str[:len(b64_str) - (len(b64_str) % 4)]
-                                    raw = base64.b64decode(b64_str)
+                                    raw = _decode_loose_b64(val_bytes)
                                     # Store exactly as decoded, FLAC will re-base64 encode it and Serato will rejoice
                                     tags_extracted[desc_mapped] = raw
                             except Exception as e:
                                 logger.error(f"Error decoding Serato tag {desc} in MP4: {e}")
-                        elif key == '\xa9grp': tags_extracted['GROUPING'] = values[0].encode('utf-8')
-                        elif key == '\xa9cmt': tags_extracted['COMMENT'] = values[0].encode('utf-8')
-                        elif key == '\xa9gen': tags_extracted['GENRE'] = values[0].encode('utf-8')
-                        elif key == '\xa9pub' or key.lower() == '----:com.apple.itunes:publisher' or key.lower() == '----:com.apple.itunes:label':
+                        elif key in _MP4_TEXT_ATOMS:
+                            # tmpo is an int, the rest are already strings
+                            tags_extracted[_MP4_TEXT_ATOMS[key]] = str(values[0]).encode('utf-8')
+                        elif key == '\xa9pub' or key_lower in _MP4_LABEL_ATOMS:
                             tags_extracted['LABEL'] = values[0] if isinstance(values[0], bytes) else str(values[0]).encode('utf-8')
-                        elif key == 'rate' or key.lower() == '----:com.apple.itunes:rating':
+                        elif key == 'rate' or key_lower == '----:com.apple.itunes:rating':
                             tags_extracted['RATING'] = str(values[0]).encode('utf-8')
-                        elif key == '----:com.apple.iTunes:KEY' or key == '----:com.apple.iTunes:initialkey':
+                        elif key in _MP4_KEY_ATOMS:
                             tags_extracted['KEY'] = bytes(values[0])
-                        elif key == 'tmpo':
-                            tags_extracted['BPM'] = str(values[0]).encode('utf-8')
 
         except Exception as e:
             logger.error(f"Error extracting metadata from {source_path}: {e}")
             
         return tags_extracted
 
+    @staticmethod
+    def can_inject(target_path: str) -> bool:
+        """Tells whether inject_serato_markers can write into this file type (FLAC or ID3-tagged)."""
+        return Path(target_path).suffix.lower() in _INJECTABLE_SUFFIXES
+
+    @staticmethod
+    def get_bitrate(file_path: str) -> Optional[int]:
+        """Returns the audio bitrate in kbps read from the file headers, or None if unknown."""
+        try:
+            audio = _open_audio(file_path)
+            if audio is None:
+                # Not a container we tag (e.g. Ogg, Opus, raw AAC): let mutagen try every
+                # format it knows before the caller falls back to spawning ffprobe
+                audio = File(file_path)
+            bitrate = getattr(getattr(audio, 'info', None), 'bitrate', 0) or 0
+        except Exception as e:
+            logger.debug(f"Could not read bitrate from headers of {file_path}: {e}")
+            return None
+        return bitrate // 1000 if bitrate > 0 else None
+
     @staticmethod
     def inject_serato_markers(markers: Dict[str, bytes], target_path: str) -> bool:
         """Injects Serato metadata into the target audio file (supports FLAC and MP3)."""
@@ -135,81 +245,66 @@ class MetadataCloner:
             return False
             
         try:
-            audio = File(target_path)
+            audio = File(target_path, options=_SUPPORTED_FORMATS)
             if audio is None:
                 logger.warning(f"Unsupported target format for metadata injection: {target_path}")
                 return False
 
             if isinstance(audio, FLAC):
                 for desc, data in markers.items():
+                    desc_lower = desc.lower()
                     if desc in ['KEY', 'BPM', 'COMPOSER', 'GROUPING', 'COMMENT', 'GENRE', 'LABEL', 'RATING']:
-                        audio.tags[desc.lower()] = data.decode('utf-8', errors='ignore')
+                        audio.tags[desc_lower] = data.decode('utf-8', errors='ignore')
                     elif desc in ['SERATO_PLAYCOUNT', 'SERATO_RELVOL']:
-                        audio.tags[desc.lower()] = data.decode('utf-8', errors='ignore')
+                        audio.tags[desc_lower] = data.decode('utf-8', errors='ignore')
                     elif desc.startswith('POPM_'):
                         audio.tags['rating'] = data.decode('utf-8', errors='ignore')
                     elif desc in ['TKEY', 'TBPM', 'TCOM', 'TIT1', 'COMM', 'TCON', 'TPUB']: 
                         mapping = {'TKEY':'key', 'TBPM':'bpm', 'TCOM':'composer', 'TIT1':'grouping', 'COMM':'comment', 'TCON':'genre', 'TPUB':'label'}
                         audio.tags[mapping[desc]] = data.decode('utf-8', errors='ignore')
-                    elif "serato" in desc.lower():
+                    elif "serato" in desc_lower:
                         if desc == "Serato Markers_": continue
                         
-                        # Explicit Vorbis Serato keys: 
-                        # 'Serato VidAssoc' -> 'serato_videoassociation', 'Serato Markers2' -> 'serato_markers_v2', etc.
-                        if desc == "Serato VidAssoc": safe_key = "serato_videoassociation"
-                        elif desc == "Serato RelVolAd": safe_key = "serato_relvol"
-                        elif desc == "Serato Playcount": safe_key = "serato_playcount"
-                        elif desc == "Serato Autotags": safe_key = "serato_autotags"
-                        elif desc == "Serato Markers2": safe_key = "serato_markers_v2"
-                        elif desc == "Serato BeatGrid": safe_key = "serato_beatgrid"
-                        elif desc == "Serato Overview": safe_key = "serato_overview"
-                        elif desc == "Serato Analysis": safe_key = "serato_analysis"
-                        else: safe_key = desc.replace(' ', '_').lower()
+                        safe_key = _FLAC_SERATO_KEYS.get(desc) or desc_lower.replace(' ', '_')
                         b64_data = base64.b64encode(data).decode('ascii')
                         audio.tags[safe_key] = b64_data
                         
                         if safe_key == "serato_markers_v2":
                             audio.tags["serato_markers2"] = b64_data
                         
-                audio.save()
+                audio.save(padding=_tag_padding)
+                # Drop parses keyed on the pre-save stat of this file
+                _open_cached.cache_clear()
                 return True
                 
             elif hasattr(audio, 'tags') and audio.tags is not None and not isinstance(audio, MP4):
                 # ID3 injection
-                from mutagen.id3 import GEOB, TKEY, TBPM, TCOM, TIT1, COMM, TCON, TPUB, TXXX
                 try:
                     audio.add_tags()
                 except Exception:
                     pass
                     
                 for desc, data in markers.items():
-                    decoded_data = data.decode('utf-8', errors='ignore')
+                    # Only text values are decoded; Serato GEOB blobs (often 100KB+) are passed through as-is
+                    desc_lower = desc.lower()
                     
-                    if desc == 'KEY': audio.tags.add(TKEY(encoding=3, text=[decoded_data]))
-                    elif desc == 'BPM': audio.tags.add(TBPM(encoding=3, text=[decoded_data]))
-                    elif desc == 'COMPOSER': audio.tags.add(TCOM(encoding=3, text=[decoded_data]))
-                    elif desc == 'GROUPING': audio.tags.add(TIT1(encoding=3, text=[decoded_data]))
-                    elif desc == 'COMMENT': audio.tags.add(COMM(encoding=3, lang='eng', desc='', text=[decoded_data]))
-                    elif desc == 'GENRE': audio.tags.add(TCON(encoding=3, text=[decoded_data]))
-                    elif desc == 'LABEL' or desc == 'TPUB': audio.tags.add(TPUB(encoding=3, text=[decoded_data]))
-                    elif desc == 'SERATO_PLAYCOUNT': audio.tags.add(TXXX(encoding=3, desc='SERATO_PLAYCOUNT', text=[decoded_data]))
-                    elif desc == 'SERATO_RELVOL': audio.tags.add(TXXX(encoding=3, desc='SERATO_RELVOL', text=[decoded_data]))
+                    text_frame = _ID3_TEXT_FRAMES.get(desc)
+                    if text_frame:
+                        audio.tags.add(text_frame(data.decode('utf-8', errors='ignore')))
                     elif desc == 'RATING':
                         try:
-                            from mutagen.id3 import POPM
-                            audio.tags.add(POPM(encoding=3, email='serato.com', rating=int(decoded_data), count=0))
+                            audio.tags.add(POPM(encoding=3, email='serato.com', rating=int(data.decode('utf-8', errors='ignore')), count=0))
                         except Exception:
                             pass
                     elif desc.startswith('POPM_'):
                         try:
-                            from mutagen.id3 import POPM
                             email = desc.split('_', 1)[1] if '_' in desc else 'serato.com'
-                            audio.tags.add(POPM(encoding=3, email=email, rating=int(decoded_data), count=0))
+                            audio.tags.add(POPM(encoding=3, email=email, rating=int(data.decode('utf-8', errors='ignore')), count=0))
                         except Exception:
                             pass
-                    elif "serato" in desc.lower():
+                    elif "serato" in desc_lower:
                         out_desc = desc
-                        if out_desc.lower().startswith("serato_"):
+                        if desc_lower.startswith("serato_"):
                             out_desc = out_desc.replace('_', ' ').title().replace('Serato ', 'Serato ')
                             
                         audio.tags.add(GEOB(
@@ -218,7 +313,9 @@ class MetadataCloner:
                             desc=out_desc, 
                             data=data
                         ))
-                audio.save()
+                audio.save(padding=_tag_padding)
+                # Drop parses keyed on the pre-save stat of this file
+                _open_cached.cache_clear()
                 return True
             else:
                 logger.warning(f"Target file {target_path} does not support tagging via mutagen easily.")
@@ -1,28 +1,245 @@
 import json
 import logging
-import sqlite3
+import os
+import queue
+import re
+import shlex
+import shutil
+import subprocess
+import threading
 import time
 import tidalapi
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from types import SimpleNamespace
+from typing import List, Dict, Iterator, Optional, Tuple
 from .crate_handler import CrateHandler
 from .tidal_manager import TidalManager
 from .db_manager import DatabaseManager
+from .metadata_handler import MetadataCloner
+
+try:
+    # orjson from the 'fast' extra for mirrors.json and ffprobe reports, stdlib json otherwise
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Concurrent per-track lookups (disk + Tidal) in sync_mirror; override with settings.sync_workers
+DEFAULT_SYNC_WORKERS = 8
+
+# Audio files tidal-dl-ng may leave in the download dir
+MEDIA_EXTENSIONS = frozenset({'.flac', '.mp3', '.mp4', '.m4a', '.wav'})
+
+# (marker, pattern, replacement) applied in order by SyncEngine._clean_search_term, compiled once.
+# A pattern only runs when its marker is in the lowercased text (None: always); every string
+# the pattern can match contains the marker, so skipping never changes the result.
+# Markers avoid "i" and "s", which IGNORECASE also matches as "ı" and "ſ".
+_CLEAN_SEARCH_PATTERNS = [
+    # Remove Youtube ID format at the end (e.g. -6kzXyhqtKuE)
+    ('-', re.compile(r'-[a-zA-Z0-9_\-]{11}$'), ''),
+    # Remove any bracketed text [like this]
+    ('[', re.compile(r'\[.*?\]'), ''),
+    # Remove standalone Out Now!
+    ('out now', re.compile(r'(?i)\bout now!?\b'), ''),
+    # Remove bitrates e.g. 320Kbps, 192 Kbps, 320Kbs
+    ('kbp', re.compile(r'\b\d{3}\s*[Kk]bps?\b', re.IGNORECASE), ''),
+    # Remove video/promo tags
+    ('deo', re.compile(r'\(?Official(?: Music)? Video\)?', re.IGNORECASE), ''),
+    ('deo', re.compile(r'\(?Lyric video\)?', re.IGNORECASE), ''),
+    ('deo', re.compile(r'\(?video clip\)?', re.IGNORECASE), ''),
+    ('hq', re.compile(r'\[?HQ(?: - Exclusive)?\]?', re.IGNORECASE), ''),
+    ('1080p', re.compile(r'\bHD\s*1080p\b', re.IGNORECASE), ''),
+    ('out now', re.compile(r'\[?OUT NOW!?\]?', re.IGNORECASE), ''),
+    # Remove years in parentheses or brackets e.g. (1992), [1999]
+    (None, re.compile(r'[\(\[]\d{4}[\]\)]'), ''),
+    # Remove track number prefixes like "01 " or "15 - "
+    (None, re.compile(r'^\d{2}\s*-?\s*'), ''),
+    # Remove code prefixes like "A-TP-", "C-S-", "AA-PR-"
+    ('-', re.compile(r'^[A-Za-z]{1,2}-[A-Za-z]{1,2}-\s*'), ''),
+    # Clean up any leftover double spaces, dangling hyphens at the end
+    (None, re.compile(r'\s+'), ' '),
+    ('-', re.compile(r'\s+-\s*$'), ''),
+]
+
+
+def _scan_media_files(root: str, extensions: frozenset) -> Iterator[str]:
+    """
+    Yields the paths, relative to root, of the non-hidden media files below it.
+    Walks with os.scandir so file types come from the directory listing
+    instead of one stat and one Path object per entry, as rglob does.
+    """
+    # Entry paths all start with root + separator, so slicing is enough to make them relative
+    prefix_len = len(os.path.join(root, ''))
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif not entry.name.startswith('.') and \
+                            os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file():
+                        yield entry.path[prefix_len:]
+        except OSError:
+            continue
+
+
+# Shell loop behind _FFprobeWorker: one ffprobe per path read from stdin, each report
+# terminated by a "--- <exit status>" line so the caller knows where it ends.
+# Only the bitrate fields extract_bitrate reads are requested, not every format/stream tag.
+_FFPROBE_LOOP = (
+    'while IFS= read -r p; do '
+    'ffprobe -v quiet -print_format json '
+    '-show_entries format=bit_rate:stream=codec_type,bit_rate "$p"; s=$?; '
+    'echo; echo "--- $s"; '
+    'done'
+)
+
+
+class _FFprobeWorker:
+    """
+    Long-lived bash process that runs ffprobe for the paths written to its stdin,
+    so the bitrate fallback does not pay a fresh subprocess spawn per track.
+    Started on first use; calls are serialized since sync_mirror probes from worker threads.
+    """
+
+    def __init__(self):
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def probe(self, path: str) -> Optional[Dict]:
+        """Returns ffprobe's JSON report for path, or None if ffprobe failed on it."""
+        if '\n' in path:
+            raise ValueError("path contains a newline")
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._proc = subprocess.Popen(
+                    ['bash', '-c', _FFPROBE_LOOP],
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                    text=True, encoding='utf-8', errors='surrogateescape'
+                )
+            proc = self._proc
+            try:
+                proc.stdin.write(path + '\n')
+                proc.stdin.flush()
+                lines = []
+                for line in iter(proc.stdout.readline, ''):
+                    if line.startswith('--- '):
+                        return _json_loads(''.join(lines)) if line[4:].strip() == '0' else None
+                    lines.append(line)
+            except BrokenPipeError:
+                pass
+            self._proc = None
+            raise RuntimeError("ffprobe worker exited unexpectedly")
+
+    def close(self):
+        with self._lock:
+            if self._proc is not None:
+                self._proc.stdin.close()
+                self._proc.wait()
+                self._proc = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class _FFprobePool:
+    """
+    A fixed set of _FFprobeWorker loops, so sync_mirror's worker threads can run the
+    ffprobe fallback in parallel. LIFO hand-out means only as many loops start as
+    there are concurrent probes.
+    """
+
+    def __init__(self, size: int):
+        self._workers = [_FFprobeWorker() for _ in range(max(1, size))]
+        self._idle = queue.LifoQueue()
+        for worker in self._workers:
+            self._idle.put(worker)
+
+    def probe(self, path: str) -> Optional[Dict]:
+        worker = self._idle.get()
+        try:
+            return worker.probe(path)
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        for worker in self._workers:
+            worker.close()
+
+
+def _abs_path(local_path: str) -> str:
+    """Absolute form of a DB/crate path, which Serato and the DB store without the leading '/'."""
+    return local_path if local_path.startswith("/") else "/" + local_path
+
+
+def _split_artist_title(filename: str) -> Tuple[str, str]:
+    """
+    Splits "[NN. ]Artist - Title.ext" into (artist, title); artist is "" without a " - ".
+    str.partition scans the name once per separator, and benchmarks faster than a compiled regex here.
+    """
+    artist, sep, rest = filename.partition(" - ")
+    if not sep:
+        return "", filename.rsplit(".", 1)[0]
+    _, numbered, name = artist.partition(". ")
+    return (name if numbered else artist), rest.rsplit(".", 1)[0]
+
+
 class SyncEngine:
     """Core logic to synchronize Serato crates and Tidal playlists."""
 
     def __init__(self, config_path: str = "mirrors.json"):
         self.config_path = Path(config_path)
-        self.config = self._load_config()
+        # mirrors.json is parsed on first use (see config), not for every CLI command
+        self._config = None
+        self._config_mtime_ns = None
         self.tidal = TidalManager()
         self.db = DatabaseManager()
+        # ffprobe is CPU bound per file, so one loop per core
+        self._ffprobe = _FFprobePool(os.cpu_count() or 1)
+        # (title, artist) -> Tidal search result (None for misses) for the lifetime of this engine,
+        # so tracks repeated across crates/mirrors in one run are only searched once.
+        # Values are Futures so concurrent lookups of the same key share the first one's search
+        self._search_cache = {}
+        self._search_lock = threading.Lock()
 
     def _load_config(self):
-        with open(self.config_path, 'r') as f:
-            return json.load(f)
+        with open(self.config_path, 'rb') as f:
+            return _json_loads(f.read())
+
+    @property
+    def config(self) -> Dict:
+        """mirrors.json, parsed on first access and re-read only when the file's mtime changes."""
+        try:
+            mtime_ns = os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            if self._config is not None:
+                return self._config
+            raise
+        if self._config is None or mtime_ns != self._config_mtime_ns:
+            self._config = self._load_config()
+            self._config_mtime_ns = mtime_ns
+        return self._config
+
+    @property
+    def settings(self) -> Dict:
+        """The "settings" section of mirrors.json."""
+        return self.config.get("settings", {})
+
+    @property
+    def sync_workers(self) -> int:
+        """settings.sync_workers as a thread pool size: at least 1, DEFAULT_SYNC_WORKERS if unset or invalid."""
+        value = self.settings.get("sync_workers", DEFAULT_SYNC_WORKERS)
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            logging.warning(f"Invalid sync_workers setting {value!r}; using {DEFAULT_SYNC_WORKERS}.")
+            return DEFAULT_SYNC_WORKERS
 
     def run_sync(self, max_bitrate: Optional[int] = None, force_update: bool = False, orphan_crate: Optional[str] = None, interactive: bool = False):
         """Executes the synchronization for all active mirrors in the database."""
@@ -36,25 +253,34 @@ class SyncEngine:
             logging.info("No active mirrors found in the database. Use 'python src/cli.py add [index]' to activate one.")
             return
 
-        for crate_path, playlist_id, direction, _, playlist_name in active_mirrors:
-            # Reformat to match what sync_mirror expects (or update sync_mirror)
-            mirror = {
-                "crate_path": crate_path,
-                "playlist_id": playlist_id,
-                "direction": direction,
-                "playlist_name": playlist_name or Path(crate_path).stem,
-                "max_bitrate": max_bitrate,
-                "force_update": force_update,
-                "orphan_crate": orphan_crate,
-                "interactive": interactive
+        # Playlist reads are independent network round-trips: start them all up front, so later
+        # mirrors' listings arrive while earlier crates sync. Each crate's sync itself stays sequential.
+        with ThreadPoolExecutor(max_workers=self.sync_workers) as prefetch:
+            playlist_futures = {
+                playlist_id: prefetch.submit(self._get_playlist_tracks, playlist_id)
+                for _, playlist_id, _, _, _ in active_mirrors if playlist_id
             }
-            try:
-                self.sync_mirror(mirror)
-            except FileNotFoundError as e:
-                logging.warning(f"Crate {crate_path} not found. Removing from local mappings. ({e})")
-                self.db.remove_mirror(crate_path)
-            except Exception as e:
-                logging.error(f"Error syncing {crate_path}: {e}")
+
+            for crate_path, playlist_id, direction, _, playlist_name in active_mirrors:
+                # Reformat to match what sync_mirror expects (or update sync_mirror)
+                mirror = {
+                    "crate_path": crate_path,
+                    "playlist_id": playlist_id,
+                    "direction": direction,
+                    "playlist_name": playlist_name or Path(crate_path).stem,
+                    "max_bitrate": max_bitrate,
+                    "force_update": force_update,
+                    "orphan_crate": orphan_crate,
+                    "interactive": interactive,
+                    "playlist_tracks": playlist_futures.get(playlist_id)
+                }
+                try:
+                    self.sync_mirror(mirror)
+                except FileNotFoundError as e:
+                    logging.warning(f"Crate {crate_path} not found. Removing from local mappings. ({e})")
+                    self.db.remove_mirror(crate_path)
+                except Exception as e:
+                    logging.error(f"Error syncing {crate_path}: {e}")
 
     def sync_mirror(self, mirror):
         crate_path = mirror.get("crate_path")
@@ -63,6 +289,7 @@ class SyncEngine:
         force_update = mirror.get("force_update", False)
         orphan_crate_name = mirror.get("orphan_crate", None)
         interactive = mirror.get("interactive", False)
+        settings = self.settings
         
         logging.info(f"Syncing crate {Path(crate_path).name} <-> Tidal '{playlist_name}' (Interactive: {interactive})")
 
@@ -77,7 +304,7 @@ class SyncEngine:
         if not playlist_id:
             logging.info(f"Playlist ID not found in mapping. Creating one...")
             # Detect base folder from settings
-            folder_name = self.config.get("settings", {}).get("tidal_base_folder")
+            folder_name = settings.get("tidal_base_folder")
             
             # We'll create it if it doesn't exist
             playlist = self.tidal.create_playlist(playlist_name, folder_name=folder_name)
@@ -90,115 +317,129 @@ class SyncEngine:
                 return
 
         # Fetch current playlist tracks once for efficiency and idempotency checks
-        playlist_tracks = self.tidal.get_playlist_tracks(playlist_id)
+        # (run_sync passes a Future for the listing it already started)
+        prefetched = mirror.get("playlist_tracks")
+        playlist_tracks, new_version = prefetched.result() if prefetched is not None else self._get_playlist_tracks(playlist_id)
+        if new_version:
+            # Stored here, on this thread and before any batch opens, so the prefetch threads never write
+            self.db.save_playlist_snapshot(playlist_id, new_version, [
+                (str(t.id), t.name, t.artist.name if getattr(t, 'artist', None) else None)
+                for t in playlist_tracks if hasattr(t, 'id')
+            ])
         tidal_playlist_ids = {str(t.id) for t in playlist_tracks if hasattr(t, 'id')}
 
         # 3. Synchronize Serato -> Tidal
-        found_on_tidal = []
+        # Insertion-ordered set: keeps crate order for the playlist push, O(1) lookups in step 4
+        found_on_tidal = {}
         orphaned_tracks = []
+        # Folders of missing files, recreated once each after the loop for recovery to download into
+        missing_dirs = set()
         max_bitrate = mirror.get("max_bitrate")
 
-        for track_data in serato_tracks:
-            local_path = track_data['local_path']
-            # Normalize path for DB (Serato uses leading / often, but let's be consistent)
-            db_path = local_path.lstrip('/')
-            
-            # Check DB cache
-            track_info = self.db.get_track_info(db_path)
-            tidal_id = track_info['tidal_id'] if track_info else None
-            bitrate = track_info['bitrate'] if track_info else None
-            
-            # Check file existence and get bitrate if missing
-            full_path = Path("/" + local_path) if not local_path.startswith("/") else Path(local_path)
-            
-            if full_path.exists():
-                if bitrate is None:
-                    bitrate = self.extract_bitrate(full_path)
-                    if bitrate:
-                        # Update DB with bitrate even if no tidal_id yet
-                        self.db.upsert_track(db_path, tidal_id, bitrate=bitrate)
-            
-            # Bitrate Filter
-            if max_bitrate and bitrate and bitrate > max_bitrate:
-                logging.info(f"Skipping track {full_path.name} (bitrate {bitrate}k > {max_bitrate}k)")
-                continue
+        # Disk probes and Tidal lookups are I/O bound, so resolve them concurrently.
+        # map() keeps crate order; everything that writes status or prompts the user stays sequential below.
+        # The DB cache for the whole crate is fetched in one query instead of one per track
+        tracks_info = self.db.get_tracks_info([t['local_path'].lstrip('/') for t in serato_tracks])
+        with ThreadPoolExecutor(max_workers=self.sync_workers) as executor:
+            resolved_tracks = list(executor.map(
+                lambda track_data: self._resolve_track(
+                    track_data['local_path'],
+                    tracks_info.get(track_data['local_path'].lstrip('/')),
+                    max_bitrate
+                ),
+                serato_tracks
+            ))
 
-            if not tidal_id:
-                # Need to search and map
-                # Extract artist/title from filename for now (simplified)
-                filename = full_path.name
-                if " - " in filename:
-                    parts = filename.split(" - ", 1)
-                    artist = parts[0].split(". ", 1)[-1] if ". " in parts[0] else parts[0]
-                    title = parts[1].rsplit(".", 1)[0]
-                else:
-                    artist = ""
-                    title = filename.rsplit(".", 1)[0]
-                
-                logging.info(f"Searching Tidal for: {title} by {artist}")
-                t_track = self.tidal.search_track(title, artist)
-                
-                if not t_track:
-                    # Retry with cleaned artist/title
-                    clean_title = self._clean_search_term(title)
-                    clean_artist = self._clean_search_term(artist)
-                    if clean_title != title or clean_artist != artist:
-                        logging.info(f"Retrying search with cleaned terms: {clean_title} by {clean_artist}")
-                        t_track = self.tidal.search_track(clean_title, clean_artist)
-
-                if t_track:
-                    tidal_id = str(t_track.id)
-                    display_name = f"{t_track.artist.name} - {t_track.name}"
-                    self.db.upsert_track(db_path, tidal_id, bitrate=bitrate, display_name=display_name)
-                    logging.info(f"\033[92mMapped: {db_path} -> {tidal_id} ({bitrate}k)\033[0m")
-                elif interactive:
-                    print(f"\n⚠️  No se encontró match automático para: {db_path}")
-                    selected_track = self.interactive_match(title, artist)
-                    if selected_track == "cancel":
-                        logging.info("Búsqueda cancelada por usuario.")
-                    elif selected_track:
-                        tidal_id = str(selected_track.id)
-                        display_name = f"{selected_track.artist.name} - {selected_track.name}"
-                        self.db.upsert_track(db_path, tidal_id, bitrate=bitrate, display_name=display_name)
-                        logging.info(f"\033[92mMapped (Manual): {db_path} -> {tidal_id} ({bitrate}k)\033[0m")
-                    else:
-                        # User selected Mark as Orphan
-                        self._handle_orphaned_track(db_path)
-                else:
-                    logging.warning(f"\033[91mCould not find on Tidal: {artist} - {title}\033[0m")
-                    orphaned_tracks.append(db_path)
-            else:
-                # Even if we have tidal_id, we might want to ensure display_name is set for future recovery
-                if not track_info.get('display_name'):
-                    try:
-                        t_track = self.tidal.session.track(tidal_id)
+        # Manual matches are asked for before the batch below opens, so its write lock is never
+        # held while a prompt waits for the user (other writers give up after 5s)
+        manual_matches = {}
+        if interactive:
+            for i, resolved in enumerate(resolved_tracks):
+                if resolved['skipped'] or (resolved['unchanged'] and not force_update):
+                    continue
+                if not resolved['tidal_id'] and not resolved['t_track']:
+                    print(f"\n⚠️  No se encontró match automático para: {resolved['db_path']}")
+                    manual_matches[i] = self.interactive_match(resolved['title'], resolved['artist'])
+
+        # One commit for the whole crate instead of one per status update
+        with self.db.batch_writes():
+            for i, resolved in enumerate(resolved_tracks):
+                db_path = resolved['db_path']
+                abs_path = resolved['abs_path']
+                track_info = resolved['track_info']
+                tidal_id = resolved['tidal_id']
+                bitrate = resolved['bitrate']
+                t_track = resolved['t_track']
+                st = resolved['stat']
+
+                if resolved['bitrate_probed']:
+                    # Update DB with bitrate even if no tidal_id yet
+                    self.db.upsert_track(db_path, tidal_id, bitrate=bitrate, mtime_ns=st.st_mtime_ns, size=st.st_size)
+
+                # Bitrate Filter
+                if resolved['skipped']:
+                    logging.info(f"Skipping track {os.path.basename(abs_path)} (bitrate {bitrate}k > {max_bitrate}k)")
+                    continue
+
+                # Synced last run from this exact file: nothing to search, probe or write
+                if resolved['unchanged'] and not force_update:
+                    found_on_tidal[tidal_id] = None
+                    continue
+
+                if not tidal_id:
+                    title, artist = resolved['title'], resolved['artist']
+                    if t_track:
+                        tidal_id = str(t_track.id)
                         display_name = f"{t_track.artist.name} - {t_track.name}"
                         self.db.upsert_track(db_path, tidal_id, bitrate=bitrate, display_name=display_name)
-                    except Exception:
-                        pass
+                        logging.info(f"\033[92mMapped: {db_path} -> {tidal_id} ({bitrate}k)\033[0m")
+                    elif interactive:
+                        selected_track = manual_matches[i]
+                        if selected_track == "cancel":
+                            logging.info("Búsqueda cancelada por usuario.")
+                        elif selected_track:
+                            tidal_id = str(selected_track.id)
+                            display_name = f"{selected_track.artist.name} - {selected_track.name}"
+                            self.db.upsert_track(db_path, tidal_id, bitrate=bitrate, display_name=display_name)
+                            logging.info(f"\033[92mMapped (Manual): {db_path} -> {tidal_id} ({bitrate}k)\033[0m")
+                        else:
+                            # User selected Mark as Orphan
+                            self._handle_orphaned_track(db_path)
+                    else:
+                        logging.warning(f"\033[91mCould not find on Tidal: {artist} - {title}\033[0m")
+                        orphaned_tracks.append(db_path)
+                elif resolved['display_name']:
+                    # Even if we have tidal_id, we might want to ensure display_name is set for future recovery
+                    self.db.upsert_track(db_path, tidal_id, bitrate=bitrate, display_name=resolved['display_name'])
             
-            if tidal_id:
-                found_on_tidal.append(tidal_id)
+                if tidal_id:
+                    found_on_tidal[tidal_id] = None
                 
-                # Check if local file exists. If not, prepare for restoration.
-                if not full_path.exists():
-                    current_status = track_info.get('status') if track_info else None
-                    if current_status != 'ignored':
-                        logging.warning(f"File missing at: {full_path}. Marking as pending_download.")
-                        self.db.update_track_status(db_path, 'pending_download')
-                    else:
-                        logging.info(f"File missing at: {full_path} but is IGNORED. Skipping recovery.")
+                    # Check if local file exists. If not, prepare for restoration.
+                    if st is None:
+                        current_status = track_info.get('status') if track_info else None
+                        if current_status != 'ignored':
+                            logging.warning(f"File missing at: {abs_path}. Marking as pending_download.")
+                            self.db.update_track_status(db_path, 'pending_download')
+                        else:
+                            logging.info(f"File missing at: {abs_path} but is IGNORED. Skipping recovery.")
                         
-                    try:
-                        full_path.parent.mkdir(parents=True, exist_ok=True)
-                    except Exception as e:
-                        logging.error(f"Could not create directory {full_path.parent}: {e}")
-                else:
-                    if force_update:
-                        logging.warning(f"Forcing update for existing file: {full_path}. Marking as pending_download.")
-                        self.db.update_track_status(db_path, 'pending_download')
+                        missing_dirs.add(os.path.dirname(abs_path))
                     else:
-                        self.db.update_track_status(db_path, 'synced')
+                        if force_update:
+                            logging.warning(f"Forcing update for existing file: {abs_path}. Marking as pending_download.")
+                            self.db.update_track_status(db_path, 'pending_download')
+                        elif not (track_info and track_info.get('status') == 'synced'
+                                  and track_info.get('mtime_ns') == st.st_mtime_ns
+                                  and track_info.get('size') == st.st_size):
+                            # Only write when the status or the recorded file actually changes
+                            self.db.mark_synced(db_path, st.st_mtime_ns, st.st_size)
+
+        for parent_dir in sorted(missing_dirs):
+            try:
+                os.makedirs(parent_dir, exist_ok=True)
+            except Exception as e:
+                logging.error(f"Could not create directory {parent_dir}: {e}")
 
         # Update playlist with all found tracks
         if found_on_tidal:
@@ -225,78 +466,211 @@ class SyncEngine:
         
         # Cache synced tracks info for fuzzy matching
         synced_tracks_cache = self.db.get_synced_tracks_info()
+        # (path, display name, tidal id, cleaned title, artist) per synced track, built on first use
+        synced_names = None
         
         # We reuse playlist_tracks fetched at the beginning
         
-        for pt in playlist_tracks:
-            if not hasattr(pt, 'id'): continue
-            tidal_id = str(pt.id)
-            if tidal_id not in found_on_tidal:
-                # NEW CHECK: Is this Tidal track already synced globally in our DB?
-                existing_mapping = self.db.get_track_by_tidal_id(tidal_id)
+        with self.db.batch_writes():
+            for pt in playlist_tracks:
+                if not hasattr(pt, 'id'): continue
+                tidal_id = str(pt.id)
+                if tidal_id not in found_on_tidal:
+                    # NEW CHECK: Is this Tidal track already synced globally in our DB?
+                    existing_mapping = self.db.get_track_by_tidal_id(tidal_id)
                 
-                if existing_mapping and existing_mapping['status'] == 'synced':
-                    existing_path = existing_mapping['local_path']
-                    logging.info(f"Found new track on Tidal ({pt.name}), but it's already SYNCED locally at: {existing_path}")
+                    if existing_mapping and existing_mapping['status'] == 'synced':
+                        existing_path = existing_mapping['local_path']
+                        logging.info(f"Found new track on Tidal ({pt.name}), but it's already SYNCED locally at: {existing_path}")
                     
-                    # Add existing path to current crate immediately
-                    if handler.add_track_to_crate(existing_path):
-                        logging.info(f"✅ Added existing file to crate: {existing_path}")
-                else:
-                    # NEW FUZZY CHECK: If ID differs, does the name match any synced track?
-                    found_fuzzy = False
-                    clean_pt_name = self._clean_search_term(pt.name).lower()
-                    pt_artist = pt.artist.name.lower() if hasattr(pt, 'artist') and pt.artist else ""
+                        # Add existing path to current crate immediately
+                        if handler.add_track_to_crate(existing_path):
+                            logging.info(f"✅ Added existing file to crate: {existing_path}")
+                    else:
+                        # NEW FUZZY CHECK: If ID differs, does the name match any synced track?
+                        found_fuzzy = False
+                        clean_pt_name = self._clean_search_term(pt.name).lower()
+                        pt_artist = pt.artist.name.lower() if hasattr(pt, 'artist') and pt.artist else ""
+                        if synced_names is None:
+                            # Split and cleaned once, not again for every new Tidal track compared against them
+                            synced_names = [
+                                (s_path, s_dname, s_tid, self._clean_search_term(s_title).lower(), s_artist.lower())
+                                for s_path, s_dname, s_tid in synced_tracks_cache
+                                if s_dname and " - " in s_dname
+                                for s_artist, s_title in [s_dname.split(" - ", 1)]
+                            ]
                     
-                    for s_path, s_dname, s_tid in synced_tracks_cache:
-                        if not s_dname or " - " not in s_dname: continue
-                        
-                        s_artist, s_title = s_dname.split(" - ", 1)
-                        clean_s_title = self._clean_search_term(s_title).lower()
-                        clean_s_artist = s_artist.lower()
-                        
-                        # Match logic: titles must be similar AND one artist name must be contained in the other
-                        if (clean_pt_name in clean_s_title or clean_s_title in clean_pt_name) and \
-                           (pt_artist in clean_s_artist or clean_s_artist in pt_artist):
-                            logging.info(f"Found name-match on Tidal: '{pt.name}' (ID: {tidal_id}) matches locally synced: '{s_dname}' (ID: {s_tid})")
-                            if handler.add_track_to_crate(s_path):
-                                logging.info(f"✅ Added existing file to crate by name match: {s_path}")
-                            found_fuzzy = True
-                            break
+                        for s_path, s_dname, s_tid, clean_s_title, clean_s_artist in synced_names:
+                            # Match logic: titles must be similar AND one artist name must be contained in the other
+                            if (clean_pt_name in clean_s_title or clean_s_title in clean_pt_name) and \
+                               (pt_artist in clean_s_artist or clean_s_artist in pt_artist):
+                                logging.info(f"Found name-match on Tidal: '{pt.name}' (ID: {tidal_id}) matches locally synced: '{s_dname}' (ID: {s_tid})")
+                                if handler.add_track_to_crate(s_path):
+                                    logging.info(f"✅ Added existing file to crate by name match: {s_path}")
+                                found_fuzzy = True
+                                break
                     
-                    if found_fuzzy:
-                        continue
+                        if found_fuzzy:
+                            continue
 
-                    logging.info(f"Found new track on Tidal: {pt.name} - {pt.artist.name}")
-                    placeholder_path = f"TIDAL_IMPORT:{tidal_id}"
+                        logging.info(f"Found new track on Tidal: {pt.name} - {pt.artist.name}")
+                        placeholder_path = f"TIDAL_IMPORT:{tidal_id}"
                     
-                    display_name = f"{pt.artist.name} - {pt.name}"
-                    self.db.upsert_track(placeholder_path, tidal_id, display_name=display_name)
-                    self.db.update_track_status(placeholder_path, 'pending_download')
+                        display_name = f"{pt.artist.name} - {pt.name}"
+                        self.db.upsert_track(placeholder_path, tidal_id, display_name=display_name)
+                        self.db.update_track_status(placeholder_path, 'pending_download')
                     
-                    # Register that it needs to be added to THIS crate
-                    self.db.add_pending_crate_addition(tidal_id, crate_path)
-                    new_from_tidal += 1
+                        # Register that it needs to be added to THIS crate
+                        self.db.add_pending_crate_addition(tidal_id, crate_path)
+                        new_from_tidal += 1
                 
         if new_from_tidal > 0:
             logging.info(f"Scheduled {new_from_tidal} new track(s) from Tidal for download.")
 
+    def _resolve_track(self, local_path: str, track_info: Optional[Dict], max_bitrate: Optional[int]) -> Dict:
+        """
+        Gathers everything sync_mirror needs for one crate track without writing to the DB:
+        bitrate and, when unmapped, the Tidal search result. track_info is the DB cache row, if any.
+        Runs in worker threads, so it must not prompt the user.
+        """
+        # Normalize path for DB (Serato uses leading / often, but let's be consistent)
+        db_path = local_path.lstrip('/')
+        
+        tidal_id = track_info['tidal_id'] if track_info else None
+        bitrate = track_info['bitrate'] if track_info else None
+        
+        # Check file existence and get bitrate if missing; one stat per track, carried in the result
+        abs_path = _abs_path(local_path)
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            st = None
+
+        # Same file (mtime + size) as the last successful sync: the cached row is all we need
+        # (a bitrate is only needed when this sync filters on it)
+        unchanged = bool(
+            st and track_info and tidal_id and (bitrate is not None or max_bitrate is None)
+            and track_info.get('status') == 'synced' and track_info.get('display_name')
+            and track_info.get('mtime_ns') == st.st_mtime_ns and track_info.get('size') == st.st_size
+        )
+
+        bitrate_probed = False
+        if st is not None:
+            # A cached bitrate is only trusted for the file it was read from
+            stale = bitrate is not None and track_info.get('mtime_ns') is not None and \
+                (track_info['mtime_ns'], track_info['size']) != (st.st_mtime_ns, st.st_size)
+            if stale:
+                bitrate = None
+            # Only the bitrate filter needs a missing one, so don't probe when no max_bitrate is set;
+            # a stale one is always refreshed so the DB never pairs it with the new file's stat
+            if bitrate is None and (max_bitrate is not None or stale):
+                bitrate = self.extract_bitrate(Path(abs_path))
+                # Stored by sync_mirror inside its batch, not with a commit per worker thread
+                bitrate_probed = bool(bitrate)
+
+        resolved = {
+            'db_path': db_path,
+            'abs_path': abs_path,
+            'track_info': track_info,
+            'tidal_id': tidal_id,
+            'bitrate': bitrate,
+            'stat': st,
+            'bitrate_probed': bitrate_probed,
+            'unchanged': unchanged,
+            'skipped': bool(max_bitrate and bitrate and bitrate > max_bitrate),
+            't_track': None,
+            'display_name': None,
+            'title': None,
+            'artist': None,
+        }
+        if resolved['skipped'] or unchanged:
+            return resolved
+
+        if not tidal_id:
+            # Need to search and map
+            # Extract artist/title from filename for now (simplified)
+            artist, title = _split_artist_title(os.path.basename(abs_path))
+            resolved['title'], resolved['artist'] = title, artist
+            
+            logging.info(f"Searching Tidal for: {title} by {artist}")
+            t_track = self._search_track(title, artist)
+            
+            if not t_track:
+                # Retry with cleaned artist/title
+                clean_title = self._clean_search_term(title)
+                clean_artist = self._clean_search_term(artist)
+                if clean_title != title or clean_artist != artist:
+                    logging.info(f"Retrying search with cleaned terms: {clean_title} by {clean_artist}")
+                    t_track = self._search_track(clean_title, clean_artist)
+            resolved['t_track'] = t_track
+        elif not track_info.get('display_name'):
+            # Fetch the display_name so sync_mirror can store it for future recovery
+            try:
+                t_track = self.tidal.session.track(tidal_id)
+                resolved['display_name'] = f"{t_track.artist.name} - {t_track.name}"
+            except Exception:
+                pass
+
+        return resolved
+
+    def _get_playlist_tracks(self, playlist_id: str) -> Tuple[List, Optional[str]]:
+        """
+        Gets the playlist's tracks, reusing the DB snapshot while Tidal reports the same lastUpdated
+        and track count: an unchanged playlist then costs its metadata request, not a track listing.
+        Cached tracks only carry id, name and artist.name, which is all sync_mirror reads.
+
+        Only reads the DB, so run_sync can call it on worker threads while a batch is open.
+        Returns (tracks, version); version is set when a fresh, complete listing should be saved
+        as the playlist's new snapshot, which sync_mirror does.
+        """
+        playlist = self.tidal.get_playlist(playlist_id)
+        if playlist is None:
+            return [], None
+        version = f"{playlist.last_updated}/{playlist.num_tracks}" if playlist.last_updated else None
+        if version:
+            cached = self.db.get_playlist_snapshot(playlist_id, version)
+            if cached is not None:
+                self.tidal.remember_playlist_tracks(playlist_id, (tid for tid, _, _ in cached))
+                return [
+                    SimpleNamespace(id=tid, name=name, artist=SimpleNamespace(name=artist) if artist is not None else None)
+                    for tid, name, artist in cached
+                ], None
+
+        tracks = self.tidal.get_playlist_tracks(playlist_id, playlist)
+        # Only a complete listing is cached; errors come back as an empty list
+        complete = version and len(tracks) == playlist.num_tracks
+        return tracks, version if complete else None
+
+    def _search_track(self, title: str, artist: str) -> Optional[tidalapi.Track]:
+        """
+        TidalManager.search_track, memoized per (title, artist) for this engine. sync_mirror calls it
+        from worker threads: the first caller for a key searches, the rest wait for its result.
+        """
+        key = (title, artist)
+        with self._search_lock:
+            future = self._search_cache.get(key)
+            searching = future is None
+            if searching:
+                future = self._search_cache[key] = Future()
+        if searching:
+            try:
+                future.set_result(self.tidal.search_track(title, artist))
+            except Exception as e:
+                # Failures are not cached: waiting callers get the error, later ones search again
+                with self._search_lock:
+                    del self._search_cache[key]
+                future.set_exception(e)
+        return future.result()
+
     def extract_bitrate(self, file_path: Path) -> Optional[int]:
-        """Extracts bitrate in kbps using ffprobe."""
-        import subprocess
-        import json
+        """Extracts bitrate in kbps from the audio headers, falling back to ffprobe."""
+        bitrate = MetadataCloner.get_bitrate(str(file_path))
+        if bitrate:
+            return bitrate
+
         try:
-            cmd = [
-                'ffprobe', 
-                '-v', 'quiet', 
-                '-print_format', 'json', 
-                '-show_format', 
-                '-show_streams',
-                str(file_path)
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
+            data = self._ffprobe.probe(str(file_path))
+            if data is not None:
                 bitrate = int(data.get('format', {}).get('bit_rate', 0) or 0) // 1000
                 
                 if bitrate <= 0:
@@ -318,77 +692,139 @@ class SyncEngine:
             
         return None
 
+    def _prefetch_display_names(self, pending: List[Tuple[str, str]], pending_info: Dict[str, Dict]):
+        """
+        Fetches "Artist - Title" from Tidal for the pending (db_path, tidal_id) pairs that have
+        no display_name yet, caches it in the DB and fills it into pending_info.
+        The lookups are independent HTTP calls, so they run on a thread pool.
+        """
+        missing = [(db_path, tidal_id) for db_path, tidal_id in pending
+                   if tidal_id and not (pending_info.get(db_path) or {}).get('display_name')]
+        if not missing or not self.tidal.authenticate():
+            return
+
+        def fetch(tidal_id):
+            try:
+                t_track = self.tidal.session.track(tidal_id)
+                return f"{t_track.artist.name} - {t_track.name}"
+            except Exception:
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.sync_workers) as executor:
+            display_names = list(executor.map(fetch, [tidal_id for _, tidal_id in missing]))
+
+        with self.db.batch_writes():
+            for (db_path, tidal_id), display_name in zip(missing, display_names):
+                if display_name:
+                    # Cache it for next time
+                    self.db.upsert_track(db_path, tidal_id, display_name=display_name)
+                    pending_info.setdefault(db_path, {})['display_name'] = display_name
+
     def _clean_search_term(self, text: str) -> str:
         """Removes common dirty characters/tags from track or artist names to improve search matches."""
         if not text:
             return text
-            
-        import re
-        # Remove Youtube ID format at the end (e.g. -6kzXyhqtKuE)
-        text = re.sub(r'-[a-zA-Z0-9_\-]{11}$', '', text)
-        # Remove any bracketed text [like this]
-        text = re.sub(r'\[.*?\]', '', text)
-        # Remove standalone Out Now!
-        text = re.sub(r'(?i)\bout now!?\b', '', text)
-
-        # Remove bitrates e.g. 320Kbps, 192 Kbps, 320Kbs
-        text = re.sub(r'\b\d{3}\s*[Kk]bps?\b', '', text, flags=re.IGNORECASE)
-        # Remove video/promo tags
-        text = re.sub(r'\(?Official(?: Music)? Video\)?', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'\(?Lyric video\)?', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'\(?video clip\)?', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'\[?HQ(?: - Exclusive)?\]?', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'\bHD\s*1080p\b', '', text, flags=re.IGNORECASE)
-        text = re.sub(r'\[?OUT NOW!?\]?', '', text, flags=re.IGNORECASE)
-        # Remove years in parentheses or brackets e.g. (1992), [1999]
-        text = re.sub(r'[\(\[]\d{4}[\]\)]', '', text)
-        # Remove track number prefixes like "01 " or "15 - "
-        text = re.sub(r'^\d{2}\s*-?\s*', '', text)
-        # Remove code prefixes like "A-TP-", "C-S-", "AA-PR-"
-        text = re.sub(r'^[A-Za-z]{1,2}-[A-Za-z]{1,2}-\s*', '', text)
-        
-        # Clean up any leftover double spaces, dangling hyphens at the end
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'\s+-\s*$', '', text)
+
+        lowered = text.lower()
+        for marker, pattern, repl in _CLEAN_SEARCH_PATTERNS:
+            # A substring test is far cheaper than running a pattern that cannot match
+            if marker is not None and marker not in lowered:
+                continue
+            text, count = pattern.subn(repl, text)
+            if count:
+                lowered = text.lower()
         return text.strip()
 
-    def get_recovery_commands(self) -> List[str]:
-        """Generates a list of shell commands to download missing tracks using tidal-dl-ng."""
+    def get_recovery_commands(self) -> List[Tuple[str, List[str]]]:
+        """Generates (track comment, tidal-dl-ng argv) pairs to download missing tracks."""
         commands = []
         # Support custom tidal-dl-ng path via config or use system default
-        td_bin = self.config.get("settings", {}).get("tidal_dl_path", "tidal-dl-ng")
+        td_bin = self.settings.get("tidal_dl_path", "tidal-dl-ng")
         
-        with sqlite3.connect(self.db.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT local_path, tidal_track_id FROM track_mapping WHERE status = 'pending_download'")
-            rows = cursor.fetchall()
-            
-            for local_path, tidal_id in rows:
-                # Use absolute path (unless it's a Tidal import placeholder)
-                if local_path.startswith("TIDAL_IMPORT:"):
-                    full_path = Path(local_path)
-                else:
-                    full_path = Path("/" + local_path) if not local_path.startswith("/") else Path(local_path)
-                commands.append(f"# Track: {full_path}")
-                # Note: tidal-dl-ng doesn't have a direct -o flag for 'dl'. 
-                # It uses the global 'download_base_path'.
-                commands.append(f"{td_bin} dl \"https://tidal.com/track/{tidal_id}\"")
+        for local_path, tidal_id in self.db.get_pending_downloads():
+            # Use absolute path (unless it's a Tidal import placeholder)
+            if local_path.startswith("TIDAL_IMPORT:"):
+                full_path = Path(local_path)
+            else:
+                full_path = Path(_abs_path(local_path))
+            # Note: tidal-dl-ng doesn't have a direct -o flag for 'dl'. 
+            # It uses the global 'download_base_path'.
+            commands.append((f"# Track: {full_path}", [td_bin, "dl", f"https://tidal.com/track/{tidal_id}"]))
         
         return commands
 
+    def _configure_tidal_dl(self, quality: str):
+        """Sets the audio quality tidal-dl-ng downloads with."""
+        td_bin = self.settings.get("tidal_dl_path", "tidal-dl-ng")
+        try:
+            logging.info(f"Configurando calidad de audio a: {quality}")
+            subprocess.run([td_bin, "cfg", "quality_audio", quality], check=True)
+        except Exception as e:
+            logging.error(f"No se pudo configurar la calidad en tidal-dl-ng: {e}")
+
+    def _resolve_download_dir(self, temp_dir: Optional[str]) -> Path:
+        """Directory tidal-dl downloads land in: temp_dir, else tidal-dl's downloadPath, else ./_recovery_temp."""
+        if temp_dir:
+            return Path(temp_dir)
+        # Get the default tidal-dl download path if not explicitly provided
+        config_path = Path.home() / '.tidal-dl.json'
+        if config_path.exists():
+            try:
+                with open(config_path, 'r') as f:
+                    td_config = json.load(f)
+                    if 'downloadPath' in td_config:
+                        return Path(td_config['downloadPath'])
+            except Exception as e:
+                logging.warning(f"Could not parse tidal-dl config: {e}")
+        return Path("./_recovery_temp") # Fallback
+
+    def _find_existing_download(self, search_dirs: List[Path], original_stem: str, display_name: Optional[str], tidal_id: str) -> Optional[Path]:
+        """Looks for an already downloaded copy of a track, searching each directory in order."""
+        # The display-name terms only depend on the track, so clean them once rather than per file
+        clean_dname = self._clean_search_term(display_name).lower() if display_name else None
+        clean_d_artist = clean_d_title = None
+        if display_name and " - " in display_name:
+            d_artist, d_title = display_name.lower().split(" - ", 1)
+            clean_d_artist = self._clean_search_term(d_artist)
+            clean_d_title = self._clean_search_term(d_title)
+
+        original_stem_lc = original_stem.lower()
+
+        for s_dir in search_dirs:
+            logging.debug(f"Buscando en: {s_dir}")
+            # scandir walk: file types come from the listing, no stat per entry.
+            # Names are compared as plain strings, lowercased once; a Path is only built for the match.
+            for rel in _scan_media_files(str(s_dir), MEDIA_EXTENSIONS):
+                name = os.path.basename(rel)
+                stem_lc = os.path.splitext(name)[0].lower()
+                # Matching logic:
+                # 1. Exact stem match with original
+                if stem_lc == original_stem_lc:
+                    return s_dir / rel
+                    
+                # 2. Match por display_name (especialmente para TIDAL_IMPORT)
+                if display_name:
+                    # Si el nombre del archivo contiene gran parte del display name o viceversa
+                    if clean_dname in stem_lc or stem_lc in clean_dname:
+                        return s_dir / rel
+                        
+                    # Fuzzy check: artist and title parts
+                    if clean_d_title is not None and clean_d_title in stem_lc and \
+                       (not clean_d_artist or clean_d_artist in stem_lc):
+                        return s_dir / rel
+
+                # 3. Match por Tidal ID en nombre
+                if tidal_id in name:
+                    return s_dir / rel
+        return None
+
     def run_recovery(self, dry_run: bool = False, quality: str = "LOSSLESS", temp_dir: Optional[str] = None):
         """Executes recovery commands or just prints them if dry_run is True."""
         # Note: Set default dry_run to False as requested by user (execution by default)
         
         # Configure quality in tidal-dl-ng before starting
-        td_bin = self.config.get("settings", {}).get("tidal_dl_path", "tidal-dl-ng")
         if not dry_run:
-            import subprocess
-            try:
-                logging.info(f"Configurando calidad de audio a: {quality}")
-                subprocess.run([td_bin, "cfg", "quality_audio", quality], check=True)
-            except Exception as e:
-                logging.error(f"No se pudo configurar la calidad en tidal-dl-ng: {e}")
+            self._configure_tidal_dl(quality)
 
         commands = self.get_recovery_commands()
         if not commands:
@@ -397,56 +833,61 @@ class SyncEngine:
 
         if dry_run:
             logging.info("MODO DRY-RUN: Se generarían los siguientes comandos:")
-            for cmd in commands:
-                print(cmd)
+            script_lines = []
+            for comment, argv in commands:
+                script_lines.append(comment)
+                script_lines.append(shlex.join(argv))
+            for line in script_lines:
+                print(line)
             
             # Also generate the script as a fallback/record
             script_path = Path("recover_missing.sh")
             with open(script_path, "w") as f:
                 f.write("#!/bin/bash\n")
-                f.write("\n".join(commands))
+                f.write("\n".join(script_lines))
                 
             # Make executable
-            import os
             os.chmod(script_path, 0o755)
             logging.info(f"Script de respaldo generado en: {script_path}")
         else:
-            import subprocess
-            logging.info(f"Iniciando descarga de {len(commands)//2} archivos...")
+            logging.info(f"Iniciando descarga de {len(commands)} archivos...")
             try:
-                import shutil
-                import os
-                import json
-                from .metadata_handler import MetadataCloner
-                from .crate_handler import CrateHandler
-                
-                download_base_dir = Path("./_recovery_temp") # Fallback
-                
-                if temp_dir:
-                    download_base_dir = Path(temp_dir)
-                else:
-                    # Get the default tidal-dl download path if not explicitly provided
-                    config_path = Path.home() / '.tidal-dl.json'
-                    if config_path.exists():
-                        try:
-                            with open(config_path, 'r') as f:
-                                td_config = json.load(f)
-                                if 'downloadPath' in td_config:
-                                    download_base_dir = Path(td_config['downloadPath'])
-                        except Exception as e:
-                            logging.warning(f"Could not parse tidal-dl config: {e}")
-                
+                download_base_dir = self._resolve_download_dir(temp_dir)
                 download_base_dir.mkdir(parents=True, exist_ok=True)
+                allowed_exts = MEDIA_EXTENSIONS
+
+                # Settings are read once from self.config rather than re-reading mirrors.json per track
+                settings = self.settings
+                serato_dir = settings.get("serato_base_dir", "/Users/jpardo/Downloads/_Serato_")
+                import_base_dir = Path(settings.get("download_folder") or Path.home() / "Music")
+                # Places to look for files that are already downloaded (temp_dir then download_folder)
+                search_dirs = [download_base_dir]
+                download_folder = settings.get("download_folder")
+                if download_folder and Path(download_folder).exists() and Path(download_folder) != download_base_dir:
+                    search_dirs.append(Path(download_folder))
 
-                for i in range(0, len(commands), 2):
-                    comment = commands[i] # # Track: /path/to/file
-                    cmd = commands[i+1]    # tidal-dl ...
+                def snapshot_downloads() -> set:
+                    return set(_scan_media_files(str(download_base_dir), allowed_exts))
+
+                # Taken once and rolled forward after each download, so every track
+                # only walks the download dir once instead of before and after.
+                known_downloads = snapshot_downloads()
+
+                # DB cache for every pending track in one query instead of one per track
+                pending_info = self.db.get_tracks_info([comment[9:].lstrip('/') for comment, _ in commands])
+                # Display names help match already-downloaded files; fetch the missing ones up front, concurrently
+                self._prefetch_display_names(
+                    [(comment[9:].lstrip('/'), argv[-1].rsplit("/track/", 1)[-1]) for comment, argv in commands],
+                    pending_info
+                )
+
+                for comment, argv in commands:
                     original_path_str = comment[9:] # Remove "# Track: "
                     original_path_obj = Path(original_path_str)
                     target_dir = original_path_obj.parent
                     
-                    # Extract tidal_id from command
-                    tidal_id = cmd.split("/track/")[-1].strip('"')
+                    # Extract tidal_id from the track URL
+                    tidal_id = argv[-1].rsplit("/track/", 1)[-1]
                     
                     # Normalize path for checking if it's a Tidal import
                     normalized_path = original_path_str.lstrip('/')
@@ -455,8 +896,7 @@ class SyncEngine:
                     if is_tidal_import:
                         target_dir = download_base_dir
                     else:
-                        if not target_dir.exists():
-                            target_dir.mkdir(parents=True, exist_ok=True)
+                        target_dir.mkdir(parents=True, exist_ok=True)
                         
                     print(f"\n==================================================")
                     print(f"Recuperando: {original_path_obj.name}")
@@ -468,21 +908,9 @@ class SyncEngine:
                     
                     try:
                         # 1. Check if the file already exists in download_base_dir
-                        allowed_exts = {'.flac', '.mp3', '.mp4', '.m4a', '.wav'}
-                        
                         # Get track info from DB to help matching
-                        track_info = self.db.get_track_info(original_path_str.lstrip('/'))
+                        track_info = pending_info.get(normalized_path)
                         display_name = track_info.get('display_name') if track_info else None
-                        
-                        # If display_name is missing, try to fetch it from Tidal to help matching
-                        if not display_name and tidal_id and self.tidal.authenticate():
-                            try:
-                                t_track = self.tidal.session.track(tidal_id)
-                                display_name = f"{t_track.artist.name} - {t_track.name}"
-                                # Cache it for next time
-                                self.db.upsert_track(original_path_str.lstrip('/'), tidal_id, display_name=display_name)
-                            except Exception:
-                                pass
 
                         print(f"DEBUG: Buscando archivo para: {original_path_obj.name}")
                         print(f"DEBUG: Display Name: {display_name}")
@@ -492,58 +920,13 @@ class SyncEngine:
                         # STEP 1: Global DB Check - see if this Tidal ID is already synced anywhere
                         if tidal_id:
                             db_entry = self.db.get_track_by_tidal_id(tidal_id)
-                            if db_entry and db_entry['status'] == 'synced' and Path(db_entry['local_path']).exists():
+                            if db_entry and db_entry['status'] == 'synced' and os.path.isfile(db_entry['local_path']):
                                 found_file = Path(db_entry['local_path'])
                                 print(f"✅ Track ya sincronizado en la base de datos: {found_file}")
 
                         # STEP 2: Breadth-first file search (temp_dir then download_folder)
                         if not found_file:
-                            search_dirs = [download_base_dir]
-                            config = self._load_config()
-                            download_folder = config.get("settings", {}).get("download_folder")
-                            if download_folder and Path(download_folder).exists() and Path(download_folder) != download_base_dir:
-                                search_dirs.append(Path(download_folder))
-                                
-                            for s_dir in search_dirs:
-                                if found_file: break
-                                logging.debug(f"Buscando en: {s_dir}")
-                                try:
-                                    potential_files = list(s_dir.rglob("*"))
-                                except Exception:
-                                    continue
-                                
-                                for f in potential_files:
-                                    if f.is_file() and f.suffix.lower() in allowed_exts and not f.name.startswith('.'):
-                                        # Matching logic:
-                                        # 1. Exact stem match with original
-                                        if f.stem.lower() == original_path_obj.stem.lower():
-                                            found_file = f
-                                            break
-                                        
-                                        # 2. Match por display_name (especialmente para TIDAL_IMPORT)
-                                        if display_name:
-                                            clean_dname = self._clean_search_term(display_name).lower()
-                                            clean_fname = f.stem.lower()
-                                            
-                                            # Si el nombre del archivo contiene gran parte del display name o viceversa
-                                            if clean_dname in clean_fname or clean_fname in clean_dname:
-                                                found_file = f
-                                                break
-                                            
-                                            # Fuzzy check: artist and title parts
-                                            if " - " in display_name:
-                                                d_artist, d_title = display_name.lower().split(" - ", 1)
-                                                clean_d_artist = self._clean_search_term(d_artist)
-                                                clean_d_title = self._clean_search_term(d_title)
-                                                
-                                                if clean_d_title in clean_fname and (not clean_d_artist or clean_d_artist in clean_fname):
-                                                    found_file = f
-                                                    break
-
-                                        # 3. Match por Tidal ID en nombre
-                                        if tidal_id in f.name:
-                                            found_file = f
-                                            break
+                            found_file = self._find_existing_download(search_dirs, original_path_obj.stem, display_name, tidal_id)
                         
                         if found_file:
                             print(f"ℹ️  Archivo encontrado: {found_file.name}")
@@ -555,42 +938,33 @@ class SyncEngine:
                                 new_files = [str(found_file)]
                         else:
                             print(f"DEBUG: No se encontró match directo. Iniciando descarga...")
-                            # 2. Snapshot files in the download base dir before download
-                            files_before = set(
-                                str(f.relative_to(download_base_dir)) for f in download_base_dir.rglob("*") 
-                                if f.is_file() and f.suffix.lower() in allowed_exts and not f.name.startswith('.')
-                            )
-                            
-                            # Execute download
-                            subprocess.run(cmd, shell=True, check=True)
-                            
-                            # Snapshot files after download
-                            files_after = set(
-                                str(f.relative_to(download_base_dir)) for f in download_base_dir.rglob("*") 
-                                if f.is_file() and f.suffix.lower() in allowed_exts and not f.name.startswith('.')
-                            )
-                            new_files = list(files_after - files_before)
+                            try:
+                                # Execute download (argv list: no intermediate /bin/sh, no quoting issues)
+                                subprocess.run(argv, check=True)
+                            finally:
+                                # 2. Diff the download dir against the files known before this download.
+                                # Also rolled forward on failure so partial files are not credited to the next track.
+                                files_after = snapshot_downloads()
+                                new_files = list(files_after - known_downloads)
+                                known_downloads = files_after
                             
                             # FALLBACK: If tidal-dl-ng skipped the download (history), 
                             # do a broader search to find where it is.
                             if not new_files:
                                 logging.info("No se detectaron archivos nuevos. Probablemente saltado por historial. Buscando globalmente...")
-                                global_search_dirs = [download_base_dir]
-                                config = self._load_config()
-                                df = config.get("settings", {}).get("download_folder")
-                                if df and Path(df).exists() and Path(df) != download_base_dir:
-                                    global_search_dirs.append(Path(df))
-                                
-                                for g_dir in global_search_dirs:
+                                clean_dname = self._clean_search_term(display_name).lower() if display_name else None
+                                for g_dir in search_dirs:
                                     if new_files: break
-                                    for gf in g_dir.rglob("*"):
-                                        if gf.is_file() and gf.suffix.lower() in allowed_exts and not gf.name.startswith('.'):
-                                            # Substring match by ID or Display Name
-                                            if (tidal_id and tidal_id in gf.name) or \
-                                               (display_name and self._clean_search_term(display_name).lower() in gf.name.lower()):
-                                                new_files = [str(gf.relative_to(download_base_dir) if str(gf).startswith(str(download_base_dir)) else gf)]
-                                                logging.info(f"✅ Archivo encontrado tras búsqueda global: {gf.name}")
-                                                break
+                                    # The download dir was just listed for the diff above; reuse that listing
+                                    g_files = known_downloads if g_dir == download_base_dir else _scan_media_files(str(g_dir), allowed_exts)
+                                    for rel in g_files:
+                                        gf = g_dir / rel
+                                        # Substring match by ID or Display Name
+                                        if (tidal_id and tidal_id in gf.name) or \
+                                           (clean_dname is not None and clean_dname in gf.name.lower()):
+                                            new_files = [str(gf.relative_to(download_base_dir) if str(gf).startswith(str(download_base_dir)) else gf)]
+                                            logging.info(f"✅ Archivo encontrado tras búsqueda global: {gf.name}")
+                                            break
                         
                         if new_files:
                             # Assuming one file downloaded per command
@@ -605,10 +979,7 @@ class SyncEngine:
                                     first_crate_path = Path(pending_crates[0])
                                     crate_name = first_crate_path.stem
                                     
-                                    config = self._load_config()
-                                    download_folder = config.get("settings", {}).get("download_folder", str(Path.home() / "Music"))
-                                    
-                                    target_dir = Path(download_folder) / "Playlists" / crate_name
+                                    target_dir = import_base_dir / "Playlists" / crate_name
                                     target_dir.mkdir(parents=True, exist_ok=True)
                                     
                                     final_target_path = target_dir / downloaded_file.name
@@ -625,8 +996,12 @@ class SyncEngine:
                                 final_target_filename = original_path_obj.stem + downloaded_file.suffix
                                 final_target_path = target_dir / final_target_filename
                                 
-                                print("🔍 Extrayendo metadata y Serato Cue Points originales...")
-                                markers = MetadataCloner.extract_serato_markers(str(original_path_obj))
+                                # Skip parsing the original when it is gone or its tags could not be written anyway
+                                markers = None
+                                can_inject = MetadataCloner.can_inject(str(downloaded_file))
+                                if can_inject and os.path.isfile(original_path_str):
+                                    print("🔍 Extrayendo metadata y Serato Cue Points originales...")
+                                    markers = MetadataCloner.extract_serato_markers(str(original_path_obj))
                                 
                                 # Check if final target exists
                                 if final_target_path.exists():
@@ -650,18 +1025,16 @@ class SyncEngine:
                                         print("✅ Metadata de Serato clonada exitosamente.")
                                     else:
                                         print("⚠️  No se pudo inyectar la metadata de Serato.")
+                                elif not can_inject:
+                                    print(f"ℹ️  El formato {downloaded_file.suffix} no admite inyección de metadata de Serato.")
                                 else:
                                     print("ℹ️  El archivo original no contenía metadata de Serato detectable.")
                             
                             print("🔄 Actualizando base de datos local y Crates de Serato...")
                             
-                            # Call crate update functionality globally
-                            config = self._load_config()
-                            serato_dir = config.get("settings", {}).get("serato_base_dir", "/Users/jpardo/Downloads/_Serato_")
-
+                            # Call crate update functionality globally (serato_dir read once above)
                             if is_tidal_import:
-                                # ADD NEW TRACK TO TARGET CRATES
-                                pending_crates = self.db.get_pending_crate_additions(tidal_id)
+                                # ADD NEW TRACK TO TARGET CRATES (pending_crates was read when choosing the target above)
                                 for c_path in pending_crates:
                                     c_handler = CrateHandler(c_path)
                                     if c_handler.add_track_to_crate(str(final_target_path)):
@@ -762,13 +1135,12 @@ class SyncEngine:
 
     def _handle_orphaned_track(self, local_path_str: str):
         """Moves a track to the orphan directory and updates crates."""
-        import shutil
-        old_path = Path("/" + local_path_str) if not local_path_str.startswith("/") else Path(local_path_str)
+        old_path = Path(_abs_path(local_path_str))
         if not old_path.exists():
             logging.warning(f"No se pudo encontrar el archivo original para mover a huérfanos: {old_path}")
             return
 
-        orphan_dir = self.config.get("settings", {}).get("orphan_dir")
+        orphan_dir = self.settings.get("orphan_dir")
         if not orphan_dir:
             logging.error("No se ha configurado 'orphan_dir' en mirrors.json. No se puede mover el huerfano.")
             return
@@ -787,7 +1159,7 @@ class SyncEngine:
             shutil.move(str(old_path), str(new_path))
             
             # Update crates
-            serato_dir = self.config.get("settings", {}).get("serato_base_dir")
+            serato_dir = self.settings.get("serato_base_dir")
             if serato_dir:
                 modified = CrateHandler.update_track_path_globally(serato_dir, local_path_str, str(new_path))
                 if modified:
@@ -798,8 +1170,7 @@ class SyncEngine:
             self.db.update_track_status(str(new_path).lstrip('/'), 'orphan')
             # Remove old entry if path changed
             if local_path_str != str(new_path).lstrip('/'):
-                with sqlite3.connect(self.db.db_path) as conn:
-                    conn.execute("DELETE FROM track_mapping WHERE local_path = ?", (local_path_str,))
+                self.db.delete_track(local_path_str)
         except Exception as e:
             logging.error(f"Error al mover huérfano: {e}")
 
@@ -866,16 +1237,12 @@ class SyncEngine:
         existing_tracks = set()
         if crate_path.exists():
             try:
-                for t in handler.get_tracks():
-                    existing_tracks.add(t['local_path'])
+                existing_tracks = {t['local_path'] for t in handler.get_tracks()}
             except Exception:
                 pass
+        new_tracks = [t for t in tracks if t not in existing_tracks]
         
-        added = 0
-        for track_path in tracks:
-            if track_path not in existing_tracks:
-                if handler.add_track_to_crate(track_path):
-                    added += 1
+        added = handler.add_tracks_to_crate(new_tracks)
                 
         if added > 0:
             logging.info(f"\033[93mAdded {added} missing tracks to Orphan Crate '{crate_name}'\033[0m")
@@ -1,20 +1,83 @@
 import tidalapi
 import json
+import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    # Faster (de)serializer for the token and folder cache files read and written on every run
+    from orjson import dumps as _json_dumps, loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+    def _json_dumps(data) -> bytes:
+        return json.dumps(data).encode()
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive connections per host; sized above SyncEngine's default worker count
+HTTP_POOL_SIZE = 16
+
+# Searches allowed in flight at once, whatever sync_workers is set to, to stay clear of Tidal's rate limit
+MAX_CONCURRENT_SEARCHES = 8
+
+# Tracks per "add to playlist" request; tidalapi's UserPlaylist.add caps a call at 100 items
+PLAYLIST_ADD_CHUNK_SIZE = 100
+
+# Tracks per playlist listing request, and how many of those pages are fetched at once
+PLAYLIST_PAGE_SIZE = 100
+MAX_CONCURRENT_PAGES = 4
 
 
 class TidalManager:
     """Manages interactions with the Tidal API."""
 
     TOKEN_FILE = Path(".tidal_token.json")
+    # Saved tokens this close to expiry are refreshed on load, before any sync work starts
+    TOKEN_REFRESH_MARGIN = timedelta(minutes=10)
+    # A successful login check is trusted this long (seconds) before authenticate asks Tidal again
+    LOGIN_CHECK_TTL = 300
+    # Folder name -> (ID, time seen), so playlist creation skips paging the folder listing
+    FOLDER_CACHE_FILE = Path(".tidal_folder_cache.json")
+    FOLDER_CACHE_TTL = 24 * 3600
 
     def __init__(self):
         """Initialize the TidalManager."""
         self.session = tidalapi.Session()
+        self._configure_http_pool()
         self.user = None
+        self._last_login_check = 0.0  # time.monotonic() of the last successful check_login
         self._folder_cache = {}  # Cache for folder names to IDs
+        self._folder_seen = {}  # When each cached folder was last confirmed on Tidal
+        self._folder_cache_complete = False  # True once every folder page has been read into the cache
+        self._playlist_track_ids = {}  # Playlist ID -> IDs of its tracks, as last listed or added this session
+        self._playlists = {}  # Playlist ID -> Playlist object as last fetched, reused when adding tracks
+        self._playlist_locks = {}  # Playlist ID -> lock serializing additions to it
+        self._playlist_locks_guard = threading.Lock()
+        self._load_folder_cache()
+        self._search_slots = threading.BoundedSemaphore(MAX_CONCURRENT_SEARCHES)
+
+    def _configure_http_pool(self):
+        """
+        Sizes tidalapi's shared requests.Session pool for concurrent lookups, so parallel
+        searches reuse keep-alive connections instead of opening new TLS handshakes,
+        and retries rate-limited/5xx idempotent calls with exponential backoff.
+        """
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+        self.session.request_session.mount("https://", adapter)
 
     def authenticate(self) -> bool:
         """
@@ -23,13 +86,18 @@ class TidalManager:
 
         :return: True if authentication is successful, False otherwise.
         """
+        # Sync and recovery both authenticate; a session confirmed moments ago needs no new round trip
+        if self.user and time.monotonic() - self._last_login_check < self.LOGIN_CHECK_TTL:
+            return True
+
         if self._load_token():
             if self.session.check_login():
+                self._last_login_check = time.monotonic()
                 self.user = self.session.user
-                print("Successfully authenticated using saved tokens.")
+                logger.info("Successfully authenticated using saved tokens.")
                 return True
             else:
-                print("Saved tokens are invalid or expired. Re-authenticating...")
+                logger.warning("Saved tokens are invalid or expired. Re-authenticating...")
 
         # Device Login Flow
         login, future = self.session.login_oauth()
@@ -40,9 +108,10 @@ class TidalManager:
         future.result()
 
         if self.session.check_login():
+            self._last_login_check = time.monotonic()
             self.user = self.session.user
             self._save_token()
-            print("Authentication successful!")
+            logger.info("Authentication successful!")
             return True
         
         return False
@@ -55,8 +124,32 @@ class TidalManager:
             'refresh_token': self.session.refresh_token,
             'expiry_time': self.session.expiry_time.isoformat() if self.session.expiry_time else None
         }
-        with open(self.TOKEN_FILE, 'w') as f:
-            json.dump(data, f)
+        with open(self.TOKEN_FILE, 'wb') as f:
+            f.write(_json_dumps(data))
+
+    def _save_folder_cache(self):
+        """Saves the folder name -> ID cache to a file; it is only a shortcut, so failures are ignored."""
+        data = {name: [folder_id, self._folder_seen.get(name, time.time())] for name, folder_id in self._folder_cache.items()}
+        try:
+            with open(self.FOLDER_CACHE_FILE, 'wb') as f:
+                f.write(_json_dumps(data))
+        except OSError:
+            pass
+
+    def _load_folder_cache(self):
+        """Loads the folder entries confirmed on Tidal within FOLDER_CACHE_TTL."""
+        if not self.FOLDER_CACHE_FILE.exists():
+            return
+        try:
+            with open(self.FOLDER_CACHE_FILE, 'rb') as f:
+                data = _json_loads(f.read())
+            now = time.time()
+            for name, (folder_id, seen) in data.items():
+                if now - seen < self.FOLDER_CACHE_TTL:
+                    self._folder_cache[name] = folder_id
+                    self._folder_seen[name] = seen
+        except Exception:
+            pass
 
     def _load_token(self) -> bool:
         """Loads session tokens from a file if they exist."""
@@ -64,37 +157,55 @@ class TidalManager:
             return False
         
         try:
-            with open(self.TOKEN_FILE, 'r') as f:
-                data = json.load(f)
+            with open(self.TOKEN_FILE, 'rb') as f:
+                data = _json_loads(f.read())
             
-            # Note: tidalapi Session.load_oauth_session might be available in some versions
-            # but we can also set them manually or use the appropriate library method.
-            # For simplicity and compatibility with various versions of the lib:
+            # tidalapi keeps expiry_time as a naive UTC datetime
+            expiry_time = datetime.fromisoformat(data['expiry_time']) if data.get('expiry_time') else None
             self.session.load_oauth_session(
                 data['token_type'],
                 data['access_token'],
                 data['refresh_token'],
-                # expiry_time is not always needed for load
+                expiry_time,
             )
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            if expiry_time and data['refresh_token'] and expiry_time - now < self.TOKEN_REFRESH_MARGIN:
+                # Refresh now rather than letting the token lapse halfway through a long sync
+                try:
+                    if self.session.token_refresh(data['refresh_token']):
+                        self._save_token()
+                except Exception as e:
+                    logger.warning(f"Could not refresh saved Tidal token: {e}")
             return True
         except Exception:
             return False
 
-    def search_track(self, track_name: str, artist_name: str) -> Optional[tidalapi.Track]:
+    def search_track(self, track_name: str, artist_name: str, isrc: Optional[str] = None) -> Optional[tidalapi.Track]:
         """
-        Searches for a track by name and artist.
+        Searches for a track by name and artist, or by ISRC when one is known.
 
         :param track_name: Name of the track.
         :param artist_name: Name of the artist.
+        :param isrc: Optional ISRC; an exact lookup tried before the keyword search.
         :return: The first matching Track object or None.
         """
-        results = self.search_tracks(track_name, artist_name, limit=10)
+        results = []
+        if isrc:
+            try:
+                with self._search_slots:
+                    results = self.session.get_tracks_by_isrc(isrc)
+            except Exception:
+                # Unknown or invalid ISRC: the keyword search below still applies
+                results = []
+        if not results:
+            results = self.search_tracks(track_name, artist_name, limit=10)
         
         # Try to find a good match in the results
+        wanted_artist = artist_name.casefold()
         for track in results:
             # Simple check: does the artist match roughly?
-            if artist_name.lower() in track.artist.name.lower() or \
-               track.artist.name.lower() in artist_name.lower():
+            result_artist = track.artist.name.casefold()
+            if wanted_artist in result_artist or result_artist in wanted_artist:
                 return track
         
         # Fallback to first result if any
@@ -103,12 +214,24 @@ class TidalManager:
             
         return None
 
+    def search_many(self, queries: List[Tuple[str, str]]) -> Iterator[Optional[tidalapi.Track]]:
+        """
+        Runs search_track for each (track_name, artist_name[, isrc]) query concurrently,
+        yielding the results in input order as they become available.
+
+        :param queries: (track_name, artist_name) pairs, optionally with an ISRC, to search for.
+        :return: An iterator over the matching Track (or None) for each pair.
+        """
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SEARCHES) as executor:
+            yield from executor.map(lambda query: self.search_track(*query), queries)
+
     def search_tracks(self, track_name: str, artist_name: str, limit: int = 5) -> List[tidalapi.Track]:
         """
         Searches for tracks by name and artist and returns multiple results.
         """
         query = f"{track_name} {artist_name}"
-        search_result = self.session.search(query, models=[tidalapi.Track], limit=limit)
+        with self._search_slots:
+            search_result = self.session.search(query, models=[tidalapi.Track], limit=limit)
         return search_result.get('tracks', [])
 
     def create_folder(self, folder_name: str) -> Optional[str]:
@@ -124,10 +247,12 @@ class TidalManager:
             if folder and folder.id:
                 # Update cache
                 self._folder_cache[folder_name.lower()] = folder.id
+                self._folder_seen[folder_name.lower()] = time.time()
+                self._save_folder_cache()
                 return folder.id
             return None
         except Exception as e:
-            print(f"Error creating Tidal folder '{folder_name}': {e}")
+            logger.error(f"Error creating Tidal folder '{folder_name}': {e}")
             return None
 
     def get_folder_by_name(self, folder_name: str) -> Optional[str]:
@@ -138,9 +263,9 @@ class TidalManager:
         if not self.user:
             return None
         
-        # Check cache first
-        if folder_name.lower() in self._folder_cache:
-            return self._folder_cache[folder_name.lower()]
+        # Check cache first; after a full listing a miss means the folder does not exist
+        if folder_name.lower() in self._folder_cache or self._folder_cache_complete:
+            return self._folder_cache.get(folder_name.lower())
         
         try:
             # Use direct API call as tidalapi's root_folder.items() might filter by includeOnly=PLAYLIST
@@ -148,6 +273,7 @@ class TidalManager:
             base_url = "https://api.tidal.com/v2/my-collection/playlists/folders"
             limit = 50
             offset = 0
+            walked = set()
             
             while True:
                 params = {
@@ -174,17 +300,25 @@ class TidalManager:
                     folder_data = item.get('data', {})
                     folder_id = folder_data.get('id')
                     
+                    # Cache every folder on the page, so other names don't re-walk the listing
+                    # (the first folder listed under a name wins, as in the lookup itself)
+                    if folder_id and name.lower() not in walked:
+                        walked.add(name.lower())
+                        self._folder_cache[name.lower()] = folder_id
+                        self._folder_seen[name.lower()] = time.time()
                     if name.lower() == folder_name.lower() and folder_id:
-                        self._folder_cache[folder_name.lower()] = folder_id
-                        return folder_id
+                        self._save_folder_cache()
+                        return self._folder_cache[folder_name.lower()]
                 
                 if len(items) < limit:
                     break
                 offset += limit
                 
+            self._folder_cache_complete = True
+            self._save_folder_cache()
             return None
         except Exception as e:
-            print(f"Error searching for folder '{folder_name}' using direct API: {e}")
+            logger.warning(f"Error searching for folder '{folder_name}' using direct API: {e}")
             # Fallback to old method just in case API structure changes unexpectedly
             try:
                 root_folder = self.session.folder()
@@ -195,7 +329,7 @@ class TidalManager:
                         return folder_id
                 return None
             except Exception as e2:
-                print(f"Fallback search also failed: {e2}")
+                logger.error(f"Fallback search also failed: {e2}")
                 return None
 
     def move_playlist_to_folder(self, playlist_id: str, folder_id: str) -> bool:
@@ -210,12 +344,12 @@ class TidalManager:
                 folder.add_items([playlist_trn])
                 return True
             except Exception as e:
-                print(f"TRN move failed: {e}. Trying direct ID...")
+                logger.warning(f"TRN move failed: {e}. Trying direct ID...")
                 # Try just the ID as a fallback
                 folder.add_items([playlist_id])
                 return True
         except Exception as e:
-            print(f"Error moving playlist {playlist_id} to folder {folder_id}: {e}")
+            logger.error(f"Error moving playlist {playlist_id} to folder {folder_id}: {e}")
             return False
 
     def create_playlist(self, title: str, description: str = "", folder_name: str = None) -> Optional[tidalapi.Playlist]:
@@ -228,49 +362,75 @@ class TidalManager:
         :return: The created Playlist object or None.
         """
         if not self.user:
-            print("Error: User not authenticated.")
+            logger.error("User not authenticated.")
             return None
         
         try:
             playlist = self.user.create_playlist(title, description)
             if playlist and folder_name:
-                print(f"Searching for folder '{folder_name}'...")
+                logger.info(f"Searching for folder '{folder_name}'...")
                 folder_id = self.get_folder_by_name(folder_name)
                 if not folder_id:
-                    print(f"Folder '{folder_name}' not found. Creating it...")
+                    logger.info(f"Folder '{folder_name}' not found. Creating it...")
                     folder_id = self.create_folder(folder_name)
                 
                 if folder_id:
-                    print(f"Moving playlist to folder '{folder_name}' (ID: {folder_id})...")
+                    logger.info(f"Moving playlist to folder '{folder_name}' (ID: {folder_id})...")
                     if self.move_playlist_to_folder(playlist.id, folder_id):
-                        print("Successfully moved to folder.")
+                        logger.info("Successfully moved to folder.")
                     else:
-                        print(f"Warning: Could not move playlist to folder '{folder_name}'.")
+                        logger.warning(f"Could not move playlist to folder '{folder_name}'.")
                 else:
-                    print(f"Warning: Could not find or create folder '{folder_name}'.")
+                    logger.warning(f"Could not find or create folder '{folder_name}'.")
             return playlist
         except Exception as e:
-            print(f"Error creating playlist: {e}")
+            logger.error(f"Error creating playlist: {e}")
             return None
 
     def get_playlist(self, playlist_id: str) -> Optional[tidalapi.Playlist]:
         """Gets a playlist object by ID."""
         try:
-            return self.session.playlist(playlist_id)
+            playlist = self.session.playlist(playlist_id)
         except Exception:
             return None
+        self._playlists[str(playlist_id)] = playlist
+        return playlist
+
+    def remember_playlist_tracks(self, playlist_id: str, track_ids: Iterable[str]):
+        """Records a playlist's current track IDs, known from elsewhere, so adding tracks doesn't list it again."""
+        self._playlist_track_ids[str(playlist_id)] = {str(tid) for tid in track_ids}
 
-    def get_playlist_tracks(self, playlist_id: str) -> List[tidalapi.Track]:
-        """Gets all tracks from a playlist."""
+    @staticmethod
+    def _list_playlist_tracks(playlist: tidalapi.Playlist) -> List[tidalapi.Track]:
+        """Lists every track of a playlist, fetching the pages past the first one concurrently."""
+        total = int(playlist.num_tracks or 0)
+        if total <= PLAYLIST_PAGE_SIZE:
+            return playlist.tracks(limit=PLAYLIST_PAGE_SIZE)
+        offsets = range(0, total, PLAYLIST_PAGE_SIZE)
+        with ThreadPoolExecutor(max_workers=min(len(offsets), MAX_CONCURRENT_PAGES)) as executor:
+            # map keeps the pages in playlist order; a failed page raises instead of leaving a gap
+            pages = executor.map(lambda offset: playlist.tracks(limit=PLAYLIST_PAGE_SIZE, offset=offset), offsets)
+            return [track for page in pages for track in page]
+
+    def get_playlist_tracks(self, playlist_id: str, playlist: Optional[tidalapi.Playlist] = None) -> List[tidalapi.Track]:
+        """Gets all tracks from a playlist. Pass playlist when it was already fetched to skip that request."""
         try:
-            playlist = self.get_playlist(playlist_id)
+            playlist = playlist or self.get_playlist(playlist_id)
             if playlist:
-                return playlist.tracks()
+                tracks = self._list_playlist_tracks(playlist)
+                # Remembered so add_tracks_to_playlist doesn't list the playlist again
+                self._playlist_track_ids[str(playlist_id)] = {str(t.id) for t in tracks if hasattr(t, 'id')}
+                return tracks
             return []
         except Exception as e:
-            print(f"Error getting tracks for playlist {playlist_id}: {e}")
+            logger.error(f"Error getting tracks for playlist {playlist_id}: {e}")
             return []
 
+    def _playlist_lock(self, playlist_id: str) -> threading.Lock:
+        """Returns the lock that serializes additions to the given playlist."""
+        with self._playlist_locks_guard:
+            return self._playlist_locks.setdefault(str(playlist_id), threading.Lock())
+
     def add_tracks_to_playlist(self, playlist_id: str, track_ids: List[str]) -> bool:
         """
         Adds tracks to a playlist by ID, ensuring no duplicates are added.
@@ -279,39 +439,55 @@ class TidalManager:
         :param track_ids: List of track IDs to add.
         :return: True if successful (or already present), False otherwise.
         """
-        try:
-            playlist = self.get_playlist(playlist_id)
-            if playlist:
-                # Fetch existing tracks to prevent duplicates
-                existing_tracks = playlist.tracks()
-                existing_ids = {str(t.id) for t in existing_tracks if hasattr(t, 'id')}
+        # One caller at a time per playlist, so concurrent mirror syncs can't interleave their chunks
+        with self._playlist_lock(playlist_id):
+            try:
+                # The object fetched earlier this run is reused; each add() re-reads it, keeping its ETag current
+                playlist = self._playlists.get(str(playlist_id)) or self.get_playlist(playlist_id)
+                if playlist:
+                    # Existing tracks, to prevent duplicates; only fetched if not already listed this session
+                    existing_ids = self._playlist_track_ids.get(str(playlist_id))
+                    if existing_ids is None:
+                        existing_ids = {str(t.id) for t in self._list_playlist_tracks(playlist) if hasattr(t, 'id')}
+                        self._playlist_track_ids[str(playlist_id)] = existing_ids
                 
-                # Filter track_ids to only include those not already in the playlist
-                to_add = []
-                for tid in track_ids:
-                    if str(tid) not in existing_ids:
-                        to_add.append(tid)
+                    # Filter track_ids to only include those not already in the playlist
+                    to_add = []
+                    for tid in track_ids:
+                        if str(tid) not in existing_ids:
+                            to_add.append(tid)
                 
-                if to_add:
-                    playlist.add(to_add)
-                    print(f"Added {len(to_add)} new tracks to playlist '{playlist.name}'.")
+                    if to_add:
+                        # Sequential on purpose: each add is guarded by the playlist ETag it refreshes
+                        for start in range(0, len(to_add), PLAYLIST_ADD_CHUNK_SIZE):
+                            chunk = to_add[start:start + PLAYLIST_ADD_CHUNK_SIZE]
+                            try:
+                                playlist.add(chunk)
+                            except Exception as e:
+                                # Earlier chunks stay added; the next sync only sends what is still missing
+                                logger.error(f"Error adding tracks {start + 1}-{start + len(chunk)} "
+                                             f"of {len(to_add)} to playlist '{playlist.name}': {e}")
+                                return False
+                            existing_ids.update(str(tid) for tid in chunk)
+                        logger.info(f"Added {len(to_add)} new tracks to playlist '{playlist.name}'.")
+                    else:
+                        logger.info(f"No new tracks to add to playlist '{playlist.name}'.")
+                    return True
                 else:
-                    print(f"No new tracks to add to playlist '{playlist.name}'.")
-                return True
-            else:
-                print(f"Error: Playlist {playlist_id} not found.")
+                    logger.error(f"Playlist {playlist_id} not found.")
+                    return False
+            except Exception as e:
+                logger.error(f"Error adding tracks to playlist: {e}")
                 return False
-        except Exception as e:
-            print(f"Error adding tracks to playlist: {e}")
-            return False
 
 
 if __name__ == "__main__":
     # Quick test (requires manual authentication)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     manager = TidalManager()
     if manager.authenticate():
         track = manager.search_track("Blinding Lights", "The Weeknd")
         if track:
-            print(f"Found track: {track.name} by {track.artist.name} (ID: {track.id})")
+            logger.info(f"Found track: {track.name} by {track.artist.name} (ID: {track.id})")
         else:
-            print("Track not found.")
+            logger.info("Track not found.")
@@ -0,0 +1,65 @@
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from tidal_serato_sync.db_manager import DatabaseManager
+
+
+class TestDatabaseManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp.name) / "sync_map.db"
+        self.db = DatabaseManager(str(self.db_path))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_batch_writes_commit_once_at_exit(self):
+        other = DatabaseManager(str(self.db_path))
+        with self.db.batch_writes():
+            self.db.upsert_track("a.mp3", "1", bitrate=320)
+            self.db.update_track_status("a.mp3", "pending_download")
+            # Reads inside the batch see its own pending writes...
+            self.assertEqual(self.db.get_track_info("a.mp3")['status'], 'pending_download')
+            # ...other connections only see them after commit
+            self.assertIsNone(other.get_track_info("a.mp3"))
+        self.assertEqual(other.get_track_info("a.mp3")['status'], 'pending_download')
+        other.close()
+
+    def test_batch_writes_keeps_work_done_before_an_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.batch_writes():
+                self.db.upsert_track("a.mp3", "1")
+                raise RuntimeError("boom")
+        self.assertEqual(self.db.get_tidal_id("a.mp3"), "1")
+
+    def test_get_tracks_info_spans_query_chunks(self):
+        paths = [f"track_{i}.mp3" for i in range(1200)]
+        with self.db.batch_writes():
+            for i, path in enumerate(paths[::2]):
+                self.db.upsert_track(path, str(i), bitrate=320)
+
+        tracks_info = self.db.get_tracks_info(paths)
+
+        self.assertEqual(len(tracks_info), 600)
+        self.assertEqual(tracks_info["track_1198.mp3"], self.db.get_track_info("track_1198.mp3"))
+        self.assertNotIn("track_1.mp3", tracks_info)
+
+    def test_search_cache_ignores_case_and_padding(self):
+        self.assertIsNone(self.db.get_cached_search("Title", "Artist"))
+        self.db.cache_search("Title", "Artist", 7, "Title (Remix)", "Artist")
+        self.assertEqual(self.db.get_cached_search(" title", "ARTIST "), ("7", "Title (Remix)", "Artist"))
+
+    def test_delete_track(self):
+        self.db.upsert_track("a.mp3", "1")
+        self.db.delete_track("a.mp3")
+        self.assertIsNone(self.db.get_track_info("a.mp3"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -35,6 +35,21 @@ class TestIdempotency(unittest.TestCase):
         tracks = handler.get_tracks()
         self.assertEqual(len(tracks), 1)
 
+    def test_bulk_add_skips_known_and_repeated_paths(self):
+        handler = CrateHandler(str(self.test_crate))
+        handler.add_track_to_crate("Users/test/Music/track1.mp3")
+
+        added = handler.add_tracks_to_crate([
+            "/Users/test/Music/track1.mp3",
+            "Users/test/Music/track2.mp3",
+            "Users/test/Music/track3.mp3",
+            "/Users/test/Music/track2.mp3",
+        ])
+
+        self.assertEqual(added, 2)
+        self.assertEqual([t['local_path'] for t in handler.get_tracks()],
+                         ["Users/test/Music/track1.mp3", "Users/test/Music/track2.mp3", "Users/test/Music/track3.mp3"])
+
     @patch('tidalapi.Session')
     def test_tidal_manager_idempotency(self, mock_session):
         manager = TidalManager()
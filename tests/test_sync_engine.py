@@ -0,0 +1,405 @@
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from tidal_serato_sync.crate_handler import CrateHandler
+from tidal_serato_sync.db_manager import DatabaseManager
+from tidal_serato_sync.sync_engine import DEFAULT_SYNC_WORKERS, SyncEngine, _FFprobePool, _FFprobeWorker, _split_artist_title
+
+
+def make_tidal_track(track_id, artist, name):
+    track = MagicMock()
+    track.id = track_id
+    track.name = name
+    track.artist.name = artist
+    return track
+
+
+class TestSplitArtistTitle(unittest.TestCase):
+    def test_split(self):
+        self.assertEqual(_split_artist_title("01. Artist - Title (Extended Mix).mp3"), ("Artist", "Title (Extended Mix)"))
+        self.assertEqual(_split_artist_title("Jay-Z - Song - Remix.flac"), ("Jay-Z", "Song - Remix"))
+        self.assertEqual(_split_artist_title("Untitled.wav"), ("", "Untitled"))
+
+
+class TestFFprobeWorker(unittest.TestCase):
+    def setUp(self):
+        self.bin_dir = tempfile.TemporaryDirectory()
+        # Stand-in ffprobe: reports the pid of the loop that ran it, fails on "bad" paths
+        fake = Path(self.bin_dir.name) / "ffprobe"
+        fake.write_text('#!/bin/bash\ncase "${@: -1}" in *bad*) exit 1;; *slow*) sleep 0.3;; esac\n'
+                        'echo "{\\"format\\": {\\"bit_rate\\": \\"$PPID\\"}}"\n')
+        fake.chmod(0o755)
+        path_patch = patch.dict(os.environ, {"PATH": self.bin_dir.name + os.pathsep + os.environ["PATH"]})
+        path_patch.start()
+        self.addCleanup(path_patch.stop)
+
+    def tearDown(self):
+        self.bin_dir.cleanup()
+
+    def test_reuses_one_process_across_probes(self):
+        worker = _FFprobeWorker()
+        first = worker.probe("/music/a song.mp3")
+        self.assertIsNone(worker.probe("/music/bad.mp3"))
+        second = worker.probe("/music/b.mp3")
+        worker.close()
+        self.assertEqual(first, second)
+
+    def test_pool_probes_concurrently(self):
+        pool = _FFprobePool(2)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            reports = list(executor.map(pool.probe, ["/music/slow 1.mp3", "/music/slow 2.mp3"]))
+        pool.close()
+        self.assertNotEqual(reports[0], reports[1])
+
+
+class TestSyncMirror(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        config_path = self.root / "mirrors.json"
+        config_path.write_text(json.dumps({"settings": {}}))
+
+        with patch('tidal_serato_sync.sync_engine.TidalManager'), \
+             patch('tidal_serato_sync.sync_engine.DatabaseManager'):
+            self.engine = SyncEngine(str(config_path))
+        self.engine.db = DatabaseManager(str(self.root / "sync_map.db"))
+        self.engine.tidal = MagicMock()
+        self.engine.tidal.get_playlist_tracks.return_value = []
+
+        self.crate_path = self.root / "test.crate"
+        self.music_dir = self.root / "music"
+        self.music_dir.mkdir()
+
+    def tearDown(self):
+        self.engine.db.close()
+        self.tmp.cleanup()
+
+    def _add_tracks(self, names, create=True):
+        handler = CrateHandler(str(self.crate_path))
+        paths = []
+        for name in names:
+            path = self.music_dir / name
+            if create:
+                path.write_bytes(b"audio")
+            handler.add_track_to_crate(str(path))
+            paths.append(str(path).lstrip('/'))
+        return paths
+
+    def _sync(self, **kwargs):
+        mirror = {"crate_path": str(self.crate_path), "playlist_id": "pl", "playlist_name": "Test"}
+        mirror.update(kwargs)
+        with patch.object(self.engine, 'extract_bitrate', return_value=320):
+            self.engine.sync_mirror(mirror)
+
+    def test_maps_tracks_and_keeps_crate_order(self):
+        names = [f"Artist {i} - Title {i}.mp3" for i in range(12)]
+        paths = self._add_tracks(names)
+        self.engine.tidal.search_track.side_effect = \
+            lambda title, artist: make_tidal_track(title.split()[-1], artist, title)
+
+        self._sync(max_bitrate=1000)
+
+        self.engine.tidal.add_tracks_to_playlist.assert_called_once_with("pl", [str(i) for i in range(12)])
+        for i, path in enumerate(paths):
+            info = self.engine.db.get_track_info(path)
+            self.assertEqual(info['tidal_id'], str(i))
+            self.assertEqual(info['status'], 'synced')
+            self.assertEqual(info['bitrate'], 320)
+            self.assertEqual(info['display_name'], f"Artist {i} - Title {i}")
+
+    def test_duplicate_matches_are_pushed_once(self):
+        self._add_tracks(["Artist - Title.mp3", "Artist - Title (copy).mp3"])
+        self.engine.tidal.search_track.return_value = make_tidal_track("7", "Artist", "Title")
+
+        self._sync()
+
+        self.engine.tidal.add_tracks_to_playlist.assert_called_once_with("pl", ["7"])
+
+    def test_repeated_searches_hit_tidal_once(self):
+        self._add_tracks(["Artist - Title.mp3"])
+        # Same file name in another folder, in another crate
+        other_file = self.music_dir / "other" / "Artist - Title.mp3"
+        other_file.parent.mkdir()
+        other_file.write_bytes(b"audio")
+        other_crate = self.root / "other.crate"
+        CrateHandler(str(other_crate)).add_track_to_crate(str(other_file))
+        self.engine.tidal.search_track.return_value = None
+
+        self._sync()
+        self._sync(crate_path=str(other_crate), playlist_id="pl2")
+
+        self.engine.tidal.search_track.assert_called_once_with("Title", "Artist")
+
+    def test_repeated_tracks_in_one_crate_hit_tidal_once(self):
+        self._add_tracks(["Artist - Title.mp3"])
+        handler = CrateHandler(str(self.crate_path))
+        for folder in ("a", "b"):
+            path = self.music_dir / folder / "Artist - Title.mp3"
+            path.parent.mkdir()
+            path.write_bytes(b"audio")
+            handler.add_track_to_crate(str(path))
+
+        def search(title, artist):
+            # Slow enough for every worker to ask before the first search returns
+            time.sleep(0.05)
+            return make_tidal_track("7", artist, title)
+
+        self.engine.tidal.search_track.side_effect = search
+        self._sync()
+
+        self.engine.tidal.search_track.assert_called_once_with("Title", "Artist")
+        self.engine.tidal.add_tracks_to_playlist.assert_called_once_with("pl", ["7"])
+
+    def test_unchanged_playlist_is_not_listed_again(self):
+        self._add_tracks(["Artist - Title.mp3"])
+        self.engine.tidal.search_track.return_value = make_tidal_track("7", "Artist", "Title")
+        self.engine.tidal.get_playlist.return_value = SimpleNamespace(last_updated="2026-01-01T00:00:00", num_tracks=1)
+        self.engine.tidal.get_playlist_tracks.return_value = [make_tidal_track(7, "Artist", "Title")]
+
+        self._sync()
+        self._sync()
+
+        self.engine.tidal.get_playlist_tracks.assert_called_once()
+        self.engine.tidal.add_tracks_to_playlist.assert_not_called()
+
+        # A new lastUpdated means the playlist changed on Tidal
+        self.engine.tidal.get_playlist.return_value = SimpleNamespace(last_updated="2026-02-01T00:00:00", num_tracks=1)
+        self._sync()
+        self.assertEqual(self.engine.tidal.get_playlist_tracks.call_count, 2)
+
+    def test_new_tidal_tracks_are_name_matched_to_synced_files(self):
+        self._add_tracks(["Artist - Title.mp3"])
+        other_path = str(self.music_dir / "Other - Song.mp3").lstrip('/')
+        self.engine.db.upsert_track(other_path, "5", display_name="Other - Song")
+        self.engine.db.update_track_status(other_path, "synced")
+        self.engine.tidal.search_track.return_value = make_tidal_track("7", "Artist", "Title")
+        self.engine.tidal.get_playlist_tracks.return_value = [
+            make_tidal_track(7, "Artist", "Title"),
+            make_tidal_track(8, "Other", "Song"),
+            make_tidal_track(9, "Other", "Song (Extended Mix)"),
+        ]
+
+        with patch.object(self.engine, '_clean_search_term', wraps=self.engine._clean_search_term) as clean:
+            self._sync()
+
+        # The synced title is cleaned once, not once per new Tidal track
+        self.assertEqual([c.args[0] for c in clean.call_args_list].count("Song"), 2)
+        self.assertIn(other_path, [t['local_path'] for t in CrateHandler(str(self.crate_path)).get_tracks()])
+        self.assertIsNone(self.engine.db.get_track_info("TIDAL_IMPORT:8"))
+
+    def test_run_sync_prefetches_each_playlist_once(self):
+        self._add_tracks(["Artist - Title.mp3"])
+        other_crate = self.root / "other.crate"
+        CrateHandler(str(other_crate)).add_track_to_crate(str(self.music_dir / "Artist - Title.mp3"))
+        self.engine.db.add_mirror(str(self.crate_path), "pl")
+        self.engine.db.add_mirror(str(other_crate), "pl2")
+        self.engine.tidal.search_track.return_value = make_tidal_track("7", "Artist", "Title")
+        self.engine.tidal.get_playlist.return_value = None
+
+        self.engine.run_sync()
+
+        self.assertEqual(sorted(c.args[0] for c in self.engine.tidal.get_playlist.call_args_list), ["pl", "pl2"])
+        self.assertEqual(sorted(c.args for c in self.engine.tidal.add_tracks_to_playlist.call_args_list),
+                         [("pl", ["7"]), ("pl2", ["7"])])
+
+    def test_changed_playlist_prefetched_during_a_batch_is_still_synced(self):
+        self._add_tracks(["Artist - Title.mp3"])
+        other_crate = self.root / "other.crate"
+        CrateHandler(str(other_crate)).add_track_to_crate(str(self.music_dir / "Artist - Title.mp3"))
+        self.engine.db.add_mirror(str(self.crate_path), "pl")
+        self.engine.db.add_mirror(str(other_crate), "pl2")
+        self.engine.tidal.search_track.return_value = make_tidal_track("7", "Artist", "Title")
+        self.engine.tidal.get_playlist.return_value = SimpleNamespace(last_updated="2026-01-01T00:00:00", num_tracks=1)
+
+        in_batch, prefetched = threading.Event(), threading.Event()
+
+        def list_tracks(playlist_id, playlist):
+            if playlist_id == "pl2":
+                # pl2's listing completes while pl's sync holds the write lock
+                in_batch.wait(5)
+            return [make_tidal_track(8, "Other", "Song")]
+
+        def fetch(playlist_id):
+            try:
+                return get_playlist_tracks(playlist_id)
+            finally:
+                if playlist_id == "pl2":
+                    prefetched.set()
+
+        def upsert(*args, **kwargs):
+            upsert_track(*args, **kwargs)
+            if not in_batch.is_set():
+                in_batch.set()
+                prefetched.wait(10)
+
+        get_playlist_tracks, upsert_track = self.engine._get_playlist_tracks, self.engine.db.upsert_track
+        self.engine.tidal.get_playlist_tracks.side_effect = list_tracks
+        with patch.object(self.engine, '_get_playlist_tracks', side_effect=fetch), \
+                patch.object(self.engine.db, 'upsert_track', side_effect=upsert), \
+                patch.object(self.engine, 'extract_bitrate', return_value=320):
+            self.engine.run_sync()
+
+        self.assertEqual(sorted(c.args for c in self.engine.tidal.add_tracks_to_playlist.call_args_list),
+                         [("pl", ["7"]), ("pl2", ["7"])])
+        self.assertIsNotNone(self.engine.db.get_playlist_snapshot("pl2", "2026-01-01T00:00:00/1"))
+
+    def test_interactive_prompt_does_not_hold_the_write_lock(self):
+        paths = self._add_tracks(["Artist - Title.mp3", "Unknown - Song.mp3"])
+        self.engine.tidal.search_track.side_effect = \
+            lambda title, artist: make_tidal_track("7", artist, title) if artist == "Artist" else None
+
+        def prompt(title, artist):
+            # Another process on the same DB must be able to write while the user decides
+            other = sqlite3.connect(self.root / "sync_map.db", timeout=0.1)
+            try:
+                other.execute("BEGIN IMMEDIATE")
+                other.rollback()
+            finally:
+                other.close()
+            return make_tidal_track("9", artist, title)
+
+        with patch.object(self.engine, 'interactive_match', side_effect=prompt) as interactive_match:
+            self._sync(interactive=True)
+
+        interactive_match.assert_called_once_with("Song", "Unknown")
+        self.assertEqual(self.engine.db.get_track_info(paths[1])['tidal_id'], "9")
+        self.engine.tidal.add_tracks_to_playlist.assert_called_once_with("pl", ["7", "9"])
+
+    def test_bitrate_filter_skips_tracks(self):
+        self._add_tracks(["Artist - Title.mp3"])
+        self._sync(max_bitrate=192)
+
+        self.engine.tidal.search_track.assert_not_called()
+        self.engine.tidal.add_tracks_to_playlist.assert_not_called()
+
+    def test_missing_file_is_marked_pending_download(self):
+        path, = self._add_tracks(["Artist - Missing.mp3"], create=False)
+        self.engine.db.upsert_track(path, "42", display_name="Artist - Missing")
+
+        self._sync()
+
+        self.engine.tidal.search_track.assert_not_called()
+        self.assertEqual(self.engine.db.get_track_info(path)['status'], 'pending_download')
+
+    def test_unchanged_synced_file_is_not_reprocessed(self):
+        path, = self._add_tracks(["Artist - Title.mp3"])
+        self.engine.tidal.search_track.return_value = make_tidal_track("7", "Artist", "Title")
+        self._sync()
+        info = self.engine.db.get_track_info(path)
+        self.assertEqual(info['size'], len(b"audio"))
+
+        with patch.object(self.engine.db, 'mark_synced') as mark_synced:
+            self._sync()
+        mark_synced.assert_not_called()
+        self.assertEqual(self.engine.tidal.add_tracks_to_playlist.call_args.args, ("pl", ["7"]))
+
+        (self.music_dir / "Artist - Title.mp3").write_bytes(b"re-encoded audio")
+        with patch.object(self.engine.db, 'mark_synced') as mark_synced:
+            self._sync()
+        mark_synced.assert_called_once()
+
+    def test_synced_row_is_not_rewritten_when_only_display_name_is_fetched(self):
+        path, = self._add_tracks(["Artist - Title.mp3"])
+        self.engine.tidal.search_track.return_value = make_tidal_track("7", "Artist", "Title")
+        self._sync()
+        # An older row without a display name still goes through the slow path
+        self.engine.db.upsert_track(path, "7", display_name="")
+        self.engine.tidal.session.track.side_effect = Exception("offline")
+
+        with patch.object(self.engine.db, 'mark_synced') as mark_synced:
+            self._sync()
+        mark_synced.assert_not_called()
+
+    def test_bitrate_is_reprobed_when_file_changes(self):
+        path, = self._add_tracks(["Artist - Title.mp3"])
+        self.engine.tidal.search_track.return_value = make_tidal_track("7", "Artist", "Title")
+        self._sync(max_bitrate=1000)
+
+        (self.music_dir / "Artist - Title.mp3").write_bytes(b"lower quality audio")
+        mirror = {"crate_path": str(self.crate_path), "playlist_id": "pl", "playlist_name": "Test"}
+        # Refreshed even without a bitrate filter, so the stored one always matches the file
+        with patch.object(self.engine, 'extract_bitrate', return_value=128) as extract_bitrate:
+            self.engine.sync_mirror(mirror)
+        extract_bitrate.assert_called_once()
+        self.assertEqual(self.engine.db.get_track_info(path)['bitrate'], 128)
+
+    def test_bitrate_is_not_probed_without_filter(self):
+        self._add_tracks(["Artist - Title.mp3"])
+        self.engine.tidal.search_track.return_value = make_tidal_track("7", "Artist", "Title")
+        mirror = {"crate_path": str(self.crate_path), "playlist_id": "pl", "playlist_name": "Test"}
+        with patch.object(self.engine, 'extract_bitrate') as extract_bitrate:
+            self.engine.sync_mirror(mirror)
+        extract_bitrate.assert_not_called()
+        self.engine.tidal.add_tracks_to_playlist.assert_called_once_with("pl", ["7"])
+
+    def test_prefetch_display_names_for_recovery(self):
+        self.engine.db.upsert_track("music/a.mp3", "1")
+        self.engine.db.upsert_track("music/b.mp3", "2", display_name="Known - Name")
+        self.engine.tidal.session.track.side_effect = lambda tid: make_tidal_track(tid, f"Artist {tid}", f"Title {tid}")
+        pending = [("music/a.mp3", "1"), ("music/b.mp3", "2")]
+        pending_info = self.engine.db.get_tracks_info([path for path, _ in pending])
+
+        self.engine._prefetch_display_names(pending, pending_info)
+
+        self.engine.tidal.session.track.assert_called_once_with("1")
+        self.assertEqual(pending_info["music/a.mp3"]['display_name'], "Artist 1 - Title 1")
+        self.assertEqual(self.engine.db.get_track_info("music/a.mp3")['display_name'], "Artist 1 - Title 1")
+
+    def test_find_existing_download_matches_display_name(self):
+        downloads = self.root / "downloads"
+        (downloads / "Album").mkdir(parents=True)
+        (downloads / "Album" / "01 - Other Song.flac").write_bytes(b"audio")
+        (downloads / "Album" / "02 - Artist - Title.flac").write_bytes(b"audio")
+
+        with patch.object(self.engine, '_clean_search_term', wraps=self.engine._clean_search_term) as clean:
+            found = self.engine._find_existing_download([downloads], "Old Name", "Artist - Title [HQ]", "99")
+        self.assertEqual(found, downloads / "Album" / "02 - Artist - Title.flac")
+        # Cleaned once per track, not once per candidate file
+        self.assertEqual(clean.call_count, 3)
+        self.assertIsNone(self.engine._find_existing_download([downloads], "Old Name", None, "99"))
+
+    def test_config_is_reloaded_only_when_the_file_changes(self):
+        config_path = self.root / "mirrors.json"
+        with patch.object(self.engine, '_load_config', wraps=self.engine._load_config) as load_config:
+            self.assertEqual(self.engine.settings, {})
+            self.assertEqual(self.engine.settings, {})
+            self.assertEqual(load_config.call_count, 1)
+
+            config_path.write_text(json.dumps({"settings": {"sync_workers": 2}}))
+            os.utime(config_path, ns=(0, 0))
+            self.assertEqual(self.engine.settings, {"sync_workers": 2})
+            self.assertEqual(load_config.call_count, 2)
+
+    def test_invalid_sync_workers_fall_back_to_a_usable_pool_size(self):
+        config_path = self.root / "mirrors.json"
+        for value, expected in [(4, 4), ("3", 3), (0, 1), (-2, 1), ("many", DEFAULT_SYNC_WORKERS), (None, DEFAULT_SYNC_WORKERS)]:
+            config_path.write_text(json.dumps({"settings": {"sync_workers": value}}))
+            self.engine._config = None
+            self.assertEqual(self.engine.sync_workers, expected, value)
+
+    def test_zero_sync_workers_still_syncs(self):
+        (self.root / "mirrors.json").write_text(json.dumps({"settings": {"sync_workers": 0}}))
+        self.engine._config = None
+        self._add_tracks(["Artist - Title.mp3"])
+        self.engine.tidal.search_track.return_value = make_tidal_track("7", "Artist", "Title")
+
+        self._sync()
+
+        self.engine.tidal.add_tracks_to_playlist.assert_called_once_with("pl", ["7"])
+
+
+if __name__ == "__main__":
+    unittest.main()
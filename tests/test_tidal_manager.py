@@ -0,0 +1,214 @@
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from tidal_serato_sync.tidal_manager import TidalManager
+
+
+def make_track(track_id, artist):
+    track = MagicMock(id=track_id)
+    track.artist.name = artist
+    return track
+
+
+class TestAddTracksToPlaylist(unittest.TestCase):
+    def setUp(self):
+        self.manager = TidalManager()
+        self.playlist = MagicMock()
+        self.playlist.tracks.return_value = [MagicMock(id=0)]
+
+    def test_adds_new_tracks_in_chunks(self):
+        track_ids = [str(i) for i in range(250)]
+        with patch.object(self.manager, 'get_playlist', return_value=self.playlist):
+            self.assertTrue(self.manager.add_tracks_to_playlist("pl", track_ids))
+
+        chunks = [call.args[0] for call in self.playlist.add.call_args_list]
+        self.assertEqual([len(chunk) for chunk in chunks], [100, 100, 49])
+        self.assertEqual(sum(chunks, []), track_ids[1:])
+
+    def test_stops_at_the_first_failed_chunk(self):
+        self.playlist.add.side_effect = [None, Exception("500"), None]
+        with patch.object(self.manager, 'get_playlist', return_value=self.playlist):
+            self.assertFalse(self.manager.add_tracks_to_playlist("pl", [str(i) for i in range(1, 251)]))
+        self.assertEqual(self.playlist.add.call_count, 2)
+
+    def test_reuses_the_listing_from_get_playlist_tracks(self):
+        with patch.object(self.manager, 'get_playlist', return_value=self.playlist):
+            self.manager.get_playlist_tracks("pl")
+            self.manager.add_tracks_to_playlist("pl", ["0", "1"])
+            self.manager.add_tracks_to_playlist("pl", ["1", "2"])
+
+        self.playlist.tracks.assert_called_once()
+        self.assertEqual([call.args[0] for call in self.playlist.add.call_args_list], [["1"], ["2"]])
+
+    def test_reuses_the_playlist_and_remembered_tracks(self):
+        with patch.object(self.manager.session, 'playlist', return_value=self.playlist) as fetch:
+            self.manager.get_playlist("pl")
+            self.manager.remember_playlist_tracks("pl", ["0", "1"])
+            self.manager.add_tracks_to_playlist("pl", ["1", "2"])
+
+        fetch.assert_called_once()
+        self.playlist.tracks.assert_not_called()
+        self.playlist.add.assert_called_once_with(["2"])
+
+    def test_concurrent_additions_to_one_playlist_do_not_interleave(self):
+        self.playlist.add.side_effect = lambda chunk: time.sleep(0.01)
+        first = [str(i) for i in range(1, 201)]
+        second = [str(i) for i in range(201, 251)]
+        with patch.object(self.manager, 'get_playlist', return_value=self.playlist):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(lambda ids: self.manager.add_tracks_to_playlist("pl", ids), [first, second]))
+
+        added = sum((call.args[0] for call in self.playlist.add.call_args_list), [])
+        self.assertIn(added, [first + second, second + first])
+
+
+class TestGetPlaylistTracks(unittest.TestCase):
+    def test_lists_every_page_in_order(self):
+        playlist = MagicMock(num_tracks=250)
+        playlist.tracks.side_effect = lambda limit, offset=0: [MagicMock(id=i) for i in range(offset, min(offset + limit, 250))]
+
+        tracks = TidalManager().get_playlist_tracks("pl", playlist)
+
+        self.assertEqual([t.id for t in tracks], list(range(250)))
+        self.assertEqual(sorted(call.kwargs.get('offset', 0) for call in playlist.tracks.call_args_list), [0, 100, 200])
+
+
+class TestLoadToken(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        token_patch = patch.object(TidalManager, 'TOKEN_FILE', Path(self.tmp.name) / "token.json")
+        token_patch.start()
+        self.addCleanup(token_patch.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def _load(self, expires_in):
+        expiry_time = datetime.now(timezone.utc).replace(tzinfo=None) + expires_in
+        TidalManager.TOKEN_FILE.write_text(json.dumps({
+            'token_type': 'Bearer', 'access_token': 'old', 'refresh_token': 'refresh',
+            'expiry_time': expiry_time.isoformat(),
+        }))
+        manager = TidalManager()
+
+        session = manager.session
+
+        def load(token_type, access_token, refresh_token, expiry_time):
+            session.token_type, session.access_token = token_type, access_token
+            session.refresh_token, session.expiry_time = refresh_token, expiry_time
+
+        def refresh(refresh_token):
+            session.access_token = 'new'
+            session.expiry_time += timedelta(hours=4)
+            return True
+
+        with patch.object(session, 'load_oauth_session', side_effect=load), \
+                patch.object(session, 'token_refresh', side_effect=refresh) as token_refresh:
+            self.assertTrue(manager._load_token())
+        return token_refresh
+
+    def test_refreshes_a_token_about_to_expire(self):
+        token_refresh = self._load(timedelta(minutes=2))
+        token_refresh.assert_called_once_with('refresh')
+        self.assertEqual(json.loads(TidalManager.TOKEN_FILE.read_text())['access_token'], 'new')
+
+    def test_keeps_a_token_far_from_expiry(self):
+        token_refresh = self._load(timedelta(hours=2))
+        token_refresh.assert_not_called()
+        self.assertEqual(json.loads(TidalManager.TOKEN_FILE.read_text())['access_token'], 'old')
+
+
+class TestAuthenticate(unittest.TestCase):
+    def test_recent_login_check_is_reused(self):
+        manager = TidalManager()
+        manager.session.user = MagicMock()
+        with patch.object(manager, '_load_token', return_value=True), \
+                patch.object(manager.session, 'check_login', return_value=True) as check_login:
+            self.assertTrue(manager.authenticate())
+            self.assertTrue(manager.authenticate())
+            check_login.assert_called_once()
+
+            manager._last_login_check -= TidalManager.LOGIN_CHECK_TTL
+            self.assertTrue(manager.authenticate())
+            self.assertEqual(check_login.call_count, 2)
+
+
+class TestSearchTrack(unittest.TestCase):
+    def setUp(self):
+        self.manager = TidalManager()
+        self.keyword_hit = make_track(1, "Artist")
+
+    def test_isrc_match_skips_the_keyword_search(self):
+        isrc_hit = make_track(2, "Artist")
+        with patch.object(self.manager.session, 'get_tracks_by_isrc', return_value=[isrc_hit]) as by_isrc, \
+                patch.object(self.manager, 'search_tracks', return_value=[self.keyword_hit]) as search:
+            self.assertIs(self.manager.search_track("Title", "Artist", isrc="USABC1234567"), isrc_hit)
+        by_isrc.assert_called_once_with("USABC1234567")
+        search.assert_not_called()
+
+    def test_unknown_isrc_falls_back_to_the_keyword_search(self):
+        with patch.object(self.manager.session, 'get_tracks_by_isrc', side_effect=Exception("not found")), \
+                patch.object(self.manager, 'search_tracks', return_value=[self.keyword_hit]):
+            self.assertIs(self.manager.search_track("Title", "Artist", isrc="USABC1234567"), self.keyword_hit)
+
+
+class TestSearchMany(unittest.TestCase):
+    def test_results_follow_query_order(self):
+        manager = TidalManager()
+        with patch.object(manager, 'search_track', side_effect=lambda title, artist: f"{artist}:{title}" if title != "x" else None):
+            results = list(manager.search_many([("a", "A"), ("x", "X"), ("c", "C")]))
+        self.assertEqual(results, ["A:a", None, "C:c"])
+
+
+class TestGetFolderByName(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        cache_patch = patch.object(TidalManager, 'FOLDER_CACHE_FILE', Path(self.tmp.name) / "folders.json")
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_manager(self):
+        manager = TidalManager()
+        manager.user = MagicMock()
+        manager.session = MagicMock()
+        manager.session.request.request.return_value.json.return_value = {
+            'items': [{'name': 'House', 'data': {'id': 'f1'}}, {'name': 'Techno', 'data': {'id': 'f2'}}]
+        }
+        return manager
+
+    def test_one_listing_answers_every_lookup(self):
+        manager = self.make_manager()
+
+        self.assertEqual(manager.get_folder_by_name("Techno"), "f2")
+        self.assertEqual(manager.get_folder_by_name("house"), "f1")
+        self.assertIsNone(manager.get_folder_by_name("Jazz"))
+        self.assertIsNone(manager.get_folder_by_name("Jazz"))
+        # One page for the first lookup, one full walk for the first miss
+        self.assertEqual(manager.session.request.request.call_count, 2)
+
+    def test_folder_cache_persists_until_it_expires(self):
+        self.assertEqual(self.make_manager().get_folder_by_name("Techno"), "f2")
+
+        manager = self.make_manager()
+        self.assertEqual(manager.get_folder_by_name("House"), "f1")
+        manager.session.request.request.assert_not_called()
+
+        with patch('tidal_serato_sync.tidal_manager.time.time', return_value=time.time() + TidalManager.FOLDER_CACHE_TTL):
+            manager = self.make_manager()
+        self.assertEqual(manager.get_folder_by_name("House"), "f1")
+        manager.session.request.request.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()